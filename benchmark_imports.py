@@ -0,0 +1,84 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+MODULES = ('bank', 'blackjack', 'chess', 'connect4', 'elevatorsystem', 'movierecommendation', 'parkinglot')
+
+
+def parse_import_times(output):
+    # (name, depth, self us, cumulative us) per -X importtime line, in completion order. A module's
+    # imports finish before it and are indented one level deeper
+    entries = []
+    for line in output.splitlines():
+        parts = line.split('|')
+        if len(parts) != 3 or not parts[0].startswith('import time:'):
+            continue
+        try:
+            self_time, cumulative_time = int(parts[0].split(':')[1]), int(parts[1])
+        except ValueError:
+            continue
+        name = parts[2].rstrip()
+        entries.append((name.strip(), (len(name) - len(name.lstrip()) - 1) // 2, self_time, cumulative_time))
+    return entries
+
+
+def direct_imports(entries, module):
+    # (name, cumulative us) of the modules first imported by module itself
+    index = next(i for i, entry in enumerate(entries) if entry[0] == module)
+    depth = entries[index][1]
+    imports = []
+    for name, entry_depth, _, cumulative_time in reversed(entries[:index]):
+        if entry_depth <= depth:
+            break
+        if entry_depth == depth + 1:
+            imports.append((name, cumulative_time))
+    return imports
+
+
+def measure_import(module, runs=10, directory=None):
+    # Each run imports the module in a fresh interpreter. A first run writes the bytecode cache, so the
+    # figures are cold imports without compilation. Importing must not print: output means a demo ran
+    directory = directory or os.path.dirname(os.path.abspath(__file__))
+    environment = dict(os.environ)
+    environment.pop('PYTHONDONTWRITEBYTECODE', None)
+    command = [sys.executable, '-X', 'importtime', '-c', f'import {module}']
+    warmup = subprocess.run(command, cwd=directory, env=environment, capture_output=True, text=True, timeout=60,
+                            stdin=subprocess.DEVNULL)
+    if warmup.returncode != 0 or warmup.stdout:
+        raise RuntimeError(f'Importing {module} failed or produced output:\n{warmup.stdout}{warmup.stderr[-2000:]}')
+    self_times, cumulative_times = [], []
+    entries = []
+    for _ in range(runs):
+        output = subprocess.run(command, cwd=directory, env=environment, capture_output=True, text=True, timeout=60,
+                                stdin=subprocess.DEVNULL).stderr
+        entries = parse_import_times(output)
+        _, _, self_time, cumulative_time = next(entry for entry in entries if entry[0] == module)
+        self_times.append(self_time)
+        cumulative_times.append(cumulative_time)
+    # Heaviest imports the module triggered itself, from the last run
+    dependencies = sorted(((cumulative, name) for name, cumulative in direct_imports(entries, module)), reverse=True)[:3]
+    return {
+        'module': module,
+        'median_ms': statistics.median(cumulative_times) / 1000,
+        'min_ms': min(cumulative_times) / 1000,
+        'self_ms': statistics.median(self_times) / 1000,
+        'heaviest': [(name, cumulative / 1000) for cumulative, name in dependencies],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure the cold import time of each module.')
+    parser.add_argument('modules', nargs='*', default=MODULES)
+    parser.add_argument('--runs', type=int, default=10)
+    arguments = parser.parse_args()
+    print(f"{'module':<22}{'median ms':>10}{'min ms':>9}{'self ms':>9}  heaviest imports")
+    for module in arguments.modules:
+        result = measure_import(module, arguments.runs)
+        heaviest = ', '.join(f'{name} {ms:.1f}' for name, ms in result['heaviest'])
+        print(f"{module:<22}{result['median_ms']:>10.1f}{result['min_ms']:>9.1f}{result['self_ms']:>9.1f}  {heaviest}")
+
+
+if __name__ == '__main__':
+    main()
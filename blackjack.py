@@ -1,5 +1,10 @@
 from enum import Enum
+import functools
+import hashlib
+import math
+import os
 import random
+import time
 from abc import ABC, abstractmethod
 
 class Suit(Enum):
@@ -23,33 +28,81 @@ class Card:
 
 class Hand:
     def __init__(self):
-        self._score = 0
+        self._hardScore = 0     # Every ace counted as 1
+        self._aceCount = 0
         self._cards = []
 
     def addCard(self, card):
         self._cards.append(card)
-        if card.getValue() == 1:
-            self._score += 11 if (self._score + 11) <= 21 else 1
-        else:
-            self._score += card.getValue()
-        print('Score: ', self._score)
+        value = card.getValue()
+        self._hardScore += value
+        if value == 1:
+            self._aceCount += 1
     
     def getScore(self):
-        return self._score
+        # At most one ace can count as 11 without busting, so the best score needs no search
+        if self._aceCount and self._hardScore <= 11:
+            return self._hardScore + 10
+        return self._hardScore
+
+    def getHardScore(self):
+        return self._hardScore
+
+    def isSoft(self):
+        # An ace still counted as 11
+        return self._aceCount > 0 and self._hardScore <= 11
+
+    def isBust(self):
+        return self._hardScore > 21
     
     def getCards(self):
         return self._cards
+
+    def copy(self):
+        hand = Hand()
+        hand._hardScore = self._hardScore
+        hand._aceCount = self._aceCount
+        hand._cards = self._cards[:]
+        return hand
     
     def print(self):
         for card in self.getCards():
             print(card.getSuit(), card.getValue())
 
+# Cards are encoded as small ints: suit index * 13 + rank - 1. Card objects are immutable,
+# so every shoe and deck shares these 52 instances instead of allocating its own.
+CARDS = tuple(Card(suit, min(rank, 10)) for suit in Suit for rank in range(1, 14))
+
+
+def verifyHandScoring():
+    # Exhaustive check of Hand against a brute-force scorer: every sequence of card values that can be
+    # drawn up to and including the card that busts. Returns the number of sequences checked
+    valueCards = [CARDS[value - 1] for value in range(1, 11)]
+    checked = 0
+    stack = [(Hand(), ())]
+    while stack:
+        hand, values = stack.pop()
+        for card in valueCards:
+            child = hand.copy()
+            child.addCard(card)
+            sequence = values + (card.getValue(),)
+            hardScore = sum(sequence)
+            # Best total over every way of counting each ace as 1 or 11
+            totals = [hardScore + 10 * elevens for elevens in range(sequence.count(1) + 1)]
+            expected = max((total for total in totals if total <= 21), default=hardScore)
+            if child.getScore() != expected or child.getHardScore() != hardScore or \
+               child.isSoft() != (expected != hardScore) or child.isBust() != (hardScore > 21):
+                raise AssertionError(f'Hand {sequence} scored {child.getScore()}, expected {expected}')
+            checked += 1
+            if hardScore <= 21:
+                stack.append((child, sequence))
+    return checked
+
+
 class Deck:
     def __init__(self):
-        self._cards = []
-        for suit in Suit:
-            for value in range(1, 14):
-                self._cards.append(Card(suit, min(value,10)))
+        self._cards = list(CARDS)
+        self._shuffled = False
     
     def print(self):
         for card in self._cards:
@@ -57,11 +110,100 @@ class Deck:
 
     def draw(self):
         return self._cards.pop()
+
+    def needsShuffle(self):
+        return not self._shuffled
+
+    def startRound(self):
+        if self.needsShuffle():
+            self.shuffle()
     
     def shuffle(self):
-        for i in range(len(self._cards)):
-            j = random.randint(0,51)
+        # Fisher-Yates: every permutation is equally likely
+        for i in range(len(self._cards) - 1, 0, -1):
+            j = random.randint(0, i)
             self._cards[i], self._cards[j] = self._cards[j], self._cards[i]
+        self._shuffled = True
+
+
+class Shoe:
+    def __init__(self, decks=6, penetration=0.75, rng=None):
+        if not 1 <= decks <= 8:
+            raise ValueError('A shoe holds between 1 and 8 decks')
+        if not 0 < penetration <= 1:
+            raise ValueError('Penetration must be in (0, 1]')
+        self._decks = decks
+        self._cards = bytearray(range(len(CARDS))) * decks
+        self._cutCard = int(len(self._cards) * penetration)
+        self._position = len(self._cards)
+        self._roundStart = self._position    # Cards dealt from here on are still on the table
+        self._rng = rng or random.Random()
+        self._tracker = None
+
+    def attachTracker(self, tracker):
+        if tracker.getDeckCount() != self._decks:
+            raise ValueError(f'Tracker counts {tracker.getDeckCount()} decks but the shoe holds {self._decks}')
+        self._tracker = tracker
+        tracker.reset()
+        for code in self._cards[:self._position]:
+            tracker.removeCode(code)
+
+    def getDeckCount(self):
+        return self._decks
+
+    def getRemainingCount(self):
+        return len(self._cards) - self._position
+
+    def needsShuffle(self):
+        return self._position >= self._cutCard
+
+    def startRound(self):
+        # Shuffles once the cut card is reached and marks the cards dealt from now on as in play
+        if self.needsShuffle():
+            self.shuffle()
+        self._roundStart = self._position
+
+    def _shuffleRange(self, start, end):
+        # In-place Fisher-Yates over the card codes; the shoe is reused, never rebuilt
+        cards = self._cards
+        randbelow = self._rng.randrange
+        for i in range(end - 1, start, -1):
+            j = start + randbelow(i - start + 1)
+            cards[i], cards[j] = cards[j], cards[i]
+
+    def shuffle(self):
+        self._shuffleRange(0, len(self._cards))
+        self._position = 0
+        self._roundStart = 0
+        if self._tracker is not None:
+            self._tracker.reset()
+
+    def _reshuffleDiscards(self):
+        # The shoe ran out mid-round: cards of earlier rounds are shuffled back in behind the cards
+        # still on the table, so the round can finish
+        inPlay = self._cards[self._roundStart:]
+        if self._roundStart == 0:
+            raise ValueError('Shoe is empty')
+        self._cards[:] = inPlay + self._cards[:self._roundStart]
+        self._shuffleRange(len(inPlay), len(self._cards))
+        self._position = len(inPlay)
+        self._roundStart = 0
+        if self._tracker is not None:
+            self._tracker.reset()
+            for code in inPlay:
+                self._tracker.removeCode(code)
+
+    def drawCode(self):
+        if self._position >= len(self._cards):
+            self._reshuffleDiscards()
+        code = self._cards[self._position]
+        self._position += 1
+        if self._tracker is not None:
+            self._tracker.removeCode(code)
+        return code
+
+    def draw(self):
+        return CARDS[self.drawCode()]
         
 class Player(ABC):
     def __init__(self, hand):
@@ -118,6 +260,41 @@ class Dealer(Player):
         return self.getHand().getScore() < self._targetScore
     
 
+class Strategy(ABC):
+    @abstractmethod
+    def shouldHit(self, hand, dealerCard):
+        pass
+
+
+class DealerStrategy(Strategy):
+    # Mimics the dealer: hit below the target score
+    def __init__(self, targetScore=17):
+        self._targetScore = targetScore
+
+    def shouldHit(self, hand, dealerCard):
+        return hand.getScore() < self._targetScore
+
+
+class NeverBustStrategy(Strategy):
+    def shouldHit(self, hand, dealerCard):
+        return hand.getScore() <= 11
+
+
+class StrategyPlayer(UserPlayer):
+    def __init__(self, strategy, balance, hand):
+        super().__init__(balance, hand)
+        self._strategy = strategy
+        self._dealerCard = None
+
+    def setDealerCard(self, card):
+        self._dealerCard = card
+
+    def makeMove(self):
+        if self.getHand().getScore() > 21:
+            return False
+        return self._strategy.shouldHit(self.getHand(), self._dealerCard)
+    
+
 class GameRound:
     def __init__(self, player, dealer, deck):
         self._player = player
@@ -136,6 +313,7 @@ class GameRound:
         print('Player hand: ')
 
         self._player.getHand().print()
+        print('Player score: ', self._player.getHand().getScore())
         dealerCard = self._dealer.getHand().getCards()[0]
         print("Dealer's first card: ")
         dealerCard.print()
@@ -146,7 +324,7 @@ class GameRound:
         print('Player balance: ', self._player.getBalance())
 
     def play(self):
-        self._deck.shuffle()
+        self._deck.startRound()
 
         if self._player.getBalance() <= 0:
             print("Player has no more money =)")
@@ -174,6 +352,7 @@ class GameRound:
         self._dealer.updateTargetScore(self._player.getHand().getScore())
         while self._dealer.makeMove():
             self._dealer.addCard(self._deck.draw())
+        print('Dealer score: ', self._dealer.getHand().getScore())
 
         # Determine winner
         if self._dealer.getHand().getScore() > 21 or self._player.getHand().getScore() > self._dealer.getHand().getScore():
@@ -184,11 +363,548 @@ class GameRound:
             print('Player loses')
         else:
             print('Game ends in a draw')
-            self._player.recieveWinnings(userBet)
+            self._player.receiveWinnings(userBet)
         self.cleanupRound()
 
-player = UserPlayer(1000, Hand())
-dealer = Dealer(Hand())
+class StrategyTable:
+    # Hit/stand decisions indexed by (hand total, soft, dealer up card value), one byte each
+    _SIZE = 22 * 2 * 11
+    _MAGIC = b'BJST1'
+
+    def __init__(self, decisions=None):
+        self._decisions = decisions if decisions is not None else bytearray(self._SIZE)
+
+    @staticmethod
+    def _index(total, soft, dealerValue):
+        return (total * 2 + soft) * 11 + dealerValue
+
+    def setHit(self, total, soft, dealerValue, hit):
+        self._decisions[self._index(total, soft, dealerValue)] = 1 if hit else 0
+
+    def shouldHit(self, total, soft, dealerValue):
+        if total > 21:
+            return False
+        return self._decisions[(total * 2 + soft) * 11 + dealerValue] == 1
+
+    def save(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temporaryPath = f'{path}.{os.getpid()}.tmp'
+        with open(temporaryPath, 'wb') as file:
+            file.write(self._MAGIC + bytes(self._decisions))
+        os.replace(temporaryPath, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as file:
+            data = file.read()
+        if data[:len(cls._MAGIC)] != cls._MAGIC or len(data) != len(cls._MAGIC) + cls._SIZE:
+            raise ValueError('Not a strategy table')
+        return cls(bytearray(data[len(cls._MAGIC):]))
+
+
+class BasicStrategySolver:
+    # Dynamic programming over hand states for standard rules, deliberately not GameRound's dealer
+    # that chases the player's score: hit or stand only, the dealer hits below dealerTarget and
+    # stands on every total from it up, soft or hard (S17 at the default 17), and wins pay even
+    # money. Card probabilities come from the deck composition (counts of values 1-10) and are
+    # treated as fixed while a hand is played.
+    DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'blackjack')
+
+    def __init__(self, composition=None, decks=6, dealerTarget=17):
+        if composition is None:
+            composition = [4 * decks] * 9 + [16 * decks]
+        if len(composition) != 10 or sum(composition) <= 0:
+            raise ValueError('Composition must hold the counts of card values 1 to 10')
+        self._composition = tuple(composition)
+        total = sum(composition)
+        self._probabilities = [0.0] + [count / total for count in composition]
+        self._dealerTarget = dealerTarget
+        self._dealerOutcomes = {}
+        self._playerValues = {}
+
+    def getCacheKey(self):
+        key = f'{self._composition}:{self._dealerTarget}'.encode()
+        return hashlib.sha1(key).hexdigest()[:16]
+
+    @staticmethod
+    def _score(hardTotal, hasAce):
+        return hardTotal + 10 if hasAce and hardTotal + 10 <= 21 else hardTotal
+
+    def _dealerDistribution(self, hardTotal, hasAce):
+        # Probabilities of the dealer finishing on each score from 0 to 21, plus bust at index 22
+        key = (hardTotal, hasAce)
+        if key in self._dealerOutcomes:
+            return self._dealerOutcomes[key]
+        distribution = [0.0] * 23
+        score = self._score(hardTotal, hasAce)
+        if hardTotal > 21:
+            distribution[22] = 1.0
+        elif score >= self._dealerTarget:
+            distribution[score] = 1.0
+        else:
+            for value in range(1, 11):
+                probability = self._probabilities[value]
+                if probability:
+                    outcome = self._dealerDistribution(hardTotal + value, hasAce or value == 1)
+                    for i in range(23):
+                        distribution[i] += probability * outcome[i]
+        self._dealerOutcomes[key] = distribution
+        return distribution
+
+    def _standValue(self, score, dealerValue):
+        distribution = self._dealerDistribution(dealerValue, dealerValue == 1)
+        value = distribution[22]
+        for dealerScore in range(22):
+            if dealerScore < score:
+                value += distribution[dealerScore]
+            elif dealerScore > score:
+                value -= distribution[dealerScore]
+        return value
+
+    def _bestValues(self, hardTotal, hasAce, dealerValue):
+        # (stand value, hit value) for the hand
+        key = (hardTotal, hasAce, dealerValue)
+        if key in self._playerValues:
+            return self._playerValues[key]
+        stand = self._standValue(self._score(hardTotal, hasAce), dealerValue)
+        hit = 0.0
+        for value in range(1, 11):
+            probability = self._probabilities[value]
+            if not probability:
+                continue
+            nextTotal = hardTotal + value
+            if nextTotal > 21:
+                hit -= probability
+            else:
+                hit += probability * max(self._bestValues(nextTotal, hasAce or value == 1, dealerValue))
+        self._playerValues[key] = (stand, hit)
+        return stand, hit
+
+    def getExpectedValue(self):
+        # Value of the next hand under optimal hit/stand play, before any card is dealt
+        p = self._probabilities
+        total = 0.0
+        for dealerValue in range(1, 11):
+            for first in range(1, 11):
+                for second in range(first, 11):
+                    probability = p[dealerValue] * p[first] * p[second] * (1 if first == second else 2)
+                    if probability:
+                        total += probability * max(self._bestValues(first + second, first == 1 or second == 1, dealerValue))
+        return total
+
+    def solve(self):
+        table = StrategyTable()
+        for dealerValue in range(1, 11):
+            for hardTotal in range(2, 22):
+                for hasAce in (False, True):
+                    score = self._score(hardTotal, hasAce)
+                    soft = hasAce and score != hardTotal
+                    stand, hit = self._bestValues(hardTotal, hasAce, dealerValue)
+                    table.setHit(score, soft, dealerValue, hit > stand)
+        return table
+
+    def getTable(self, cacheDir=DEFAULT_CACHE_DIR):
+        if cacheDir is None:
+            return self.solve()
+        path = os.path.join(cacheDir, f'strategy-{self.getCacheKey()}.bin')
+        try:
+            return StrategyTable.load(path)
+        except (OSError, ValueError):
+            pass
+        table = self.solve()
+        try:
+            table.save(path)
+        except OSError:
+            pass    # An unwritable cache directory only means solving again next time
+        return table
+
+
+class BasicStrategy(Strategy):
+    def __init__(self, table=None):
+        self._table = table if table is not None else BasicStrategySolver().getTable()
+
+    def shouldHit(self, hand, dealerCard):
+        return self._table.shouldHit(hand.getScore(), hand.isSoft(), dealerCard.getValue())
+
+
+# Count tags by card value, index 1 is the ace and index 10 covers all ten-valued cards
+COUNTING_SYSTEMS = {
+    'HI_LO': (0, -1, 1, 1, 1, 1, 1, 0, 0, 0, -1),
+    'KO': (0, -1, 1, 1, 1, 1, 1, 1, 0, 0, -1),
+    'OMEGA_II': (0, 0, 1, 1, 2, 2, 2, 1, 0, -1, -2),
+    'ZEN': (0, -1, 1, 1, 2, 2, 2, 1, 0, 0, -2),
+}
+
+_CODE_VALUES = bytes(card.getValue() for card in CARDS)
+
+
+@functools.lru_cache(maxsize=4096)
+def estimateExpectedValue(composition):
+    # Memoized by composition vector; counts of values 1-10 left in the shoe
+    return BasicStrategySolver(composition).getExpectedValue()
+
+
+class CompositionTracker:
+    def __init__(self, decks=6, systems=tuple(COUNTING_SYSTEMS)):
+        self._decks = decks
+        self._tags = [(name, COUNTING_SYSTEMS[name]) for name in systems]
+        self.reset()
+
+    def reset(self):
+        self._counts = [0] + [4 * self._decks] * 9 + [16 * self._decks]
+        self._remaining = 52 * self._decks
+        self._runningCounts = dict.fromkeys((name for name, _ in self._tags), 0)
+
+    def removeCode(self, code):
+        self.removeValue(_CODE_VALUES[code])
+
+    def removeValue(self, value):
+        if not self._counts[value]:
+            raise ValueError(f'No cards of value {value} left')
+        self._counts[value] -= 1
+        self._remaining -= 1
+        runningCounts = self._runningCounts
+        for name, tags in self._tags:
+            runningCounts[name] += tags[value]
+
+    def getDeckCount(self):
+        return self._decks
+
+    def getComposition(self):
+        return tuple(self._counts[1:])
+
+    def getRemainingCount(self):
+        return self._remaining
+
+    def getRemainingCountOf(self, value):
+        return self._counts[value]
+
+    def getRunningCount(self, system='HI_LO'):
+        return self._runningCounts[system]
+
+    def getTrueCount(self, system='HI_LO'):
+        decksRemaining = self._remaining / 52
+        return self._runningCounts[system] / decksRemaining if decksRemaining else 0.0
+
+    def estimateExpectedValue(self):
+        if not self._remaining:
+            raise ValueError('No cards left')
+        return estimateExpectedValue(self.getComposition())
+
+
+class BlackjackSimulator:
+    # Plays hands without any I/O under standard rules, deliberately not GameRound's dealer that
+    # chases the player's score: the player follows its strategy, the dealer stands on every 17,
+    # soft or hard (S17), and wins pay even money. Outcomes are in units of the bet.
+    def __init__(self, strategy, decks=6, penetration=0.75, rng=None):
+        self._shoe = Shoe(decks, penetration, rng)
+        self._player = StrategyPlayer(strategy, 0, Hand())
+        self._dealer = Dealer(Hand())
+
+    def playHand(self):
+        shoe, player, dealer = self._shoe, self._player, self._dealer
+        shoe.startRound()
+        player.clearHand()
+        dealer.clearHand()
+        player.addCard(shoe.draw())
+        dealerCard = shoe.draw()
+        dealer.addCard(dealerCard)
+        player.addCard(shoe.draw())
+        dealer.addCard(shoe.draw())
+        player.setDealerCard(dealerCard)
+
+        while player.makeMove():
+            player.addCard(shoe.draw())
+        playerScore = player.getHand().getScore()
+        if playerScore > 21:
+            return -1
+
+        while dealer.makeMove():
+            dealer.addCard(shoe.draw())
+        dealerScore = dealer.getHand().getScore()
+        if dealerScore > 21 or playerScore > dealerScore:
+            return 1
+        return -1 if dealerScore > playerScore else 0
+
+    def playHands(self, count):
+        total = totalSquares = 0
+        playHand = self.playHand
+        for _ in range(count):
+            outcome = playHand()
+            total += outcome
+            totalSquares += outcome * outcome
+        return total, totalSquares
+
+
+def _simulateChunk(task):
+    strategy, decks, penetration, seed, chunkIndex, hands = task
+    # Each chunk owns an independent RNG stream, so results do not depend on the worker count
+    rng = random.Random(f'{seed}:{chunkIndex}')
+    total, totalSquares = BlackjackSimulator(strategy, decks, penetration, rng).playHands(hands)
+    return hands, total, totalSquares
+
+
+class SimulationResult:
+    def __init__(self, hands, total, totalSquares, elapsed):
+        self._hands = hands
+        self._total = total
+        self._totalSquares = totalSquares
+        self._elapsed = elapsed
+
+    def getHandCount(self):
+        return self._hands
+
+    def getExpectedValue(self):
+        return self._total / self._hands
+
+    def getStandardError(self):
+        mean = self.getExpectedValue()
+        variance = (self._totalSquares - self._hands * mean * mean) / max(self._hands - 1, 1)
+        return math.sqrt(max(variance, 0.0) / self._hands)
+
+    def getConfidenceInterval(self, z=1.96):
+        mean, error = self.getExpectedValue(), self.getStandardError()
+        return mean - z * error, mean + z * error
+
+    def getHandsPerSecond(self):
+        return self._hands / self._elapsed if self._elapsed else 0.0
+
+    def print(self):
+        low, high = self.getConfidenceInterval()
+        print(f'{self._hands} hands in {self._elapsed:.2f}s ({self.getHandsPerSecond():.0f} hands/s)')
+        print(f'EV per hand: {self.getExpectedValue():+.5f} (95% CI {low:+.5f} .. {high:+.5f})')
+
+
+def runSimulation(strategy, hands, workers=None, decks=6, penetration=0.75, seed=0, chunkSize=100000):
+    chunks = [(strategy, decks, penetration, seed, index, min(chunkSize, hands - start))
+              for index, start in enumerate(range(0, hands, chunkSize))]
+    start = time.perf_counter()
+    if workers == 1:
+        outputs = list(map(_simulateChunk, chunks))
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            outputs = list(executor.map(_simulateChunk, chunks))
+    elapsed = time.perf_counter() - start
+    return SimulationResult(sum(o[0] for o in outputs), sum(o[1] for o in outputs), sum(o[2] for o in outputs), elapsed)
+
+
+class WalletLedger:
+    # Bets and winnings are recorded per player and applied to balances in batches. Bets are checked
+    # against the balance minus pending debits, so a flush can never overdraw a player.
+    def __init__(self, flushSize=1024):
+        self._flushSize = flushSize
+        self._pending = {}      # Map<Player, [debits, credits]>
+        self._entries = 0
+
+    def getAvailableBalance(self, player):
+        debits, credits = self._pending.get(player, (0, 0))
+        return player.getBalance() - debits + credits
+
+    def debit(self, player, amount):
+        if amount > self.getAvailableBalance(player):
+            raise ValueError('Insufficient funds')
+        self._record(player, amount, 0)
+
+    def credit(self, player, amount):
+        self._record(player, 0, amount)
+
+    def _record(self, player, debit, credit):
+        entry = self._pending.setdefault(player, [0, 0])
+        entry[0] += debit
+        entry[1] += credit
+        self._entries += 1
+        if self._entries >= self._flushSize:
+            self.flush()
+
+    def flush(self):
+        for player, (debits, credits) in self._pending.items():
+            if debits > credits:
+                player.placeBet(debits - credits)
+            elif credits > debits:
+                player.receiveWinnings(credits - debits)
+        self._pending.clear()
+        self._entries = 0
+
+
+class TableClient(ABC):
+    # Supplies bets and decisions for one seat; a bet of 0 sits the round out
+    @abstractmethod
+    async def getBet(self, availableBalance):
+        pass
+
+    @abstractmethod
+    async def shouldHit(self, hand, dealerCard):
+        pass
+
+
+class StrategyClient(TableClient):
+    def __init__(self, strategy, bet):
+        self._strategy = strategy
+        self._bet = bet
+
+    async def getBet(self, availableBalance):
+        return self._bet if availableBalance >= self._bet else 0
+
+    async def shouldHit(self, hand, dealerCard):
+        return self._strategy.shouldHit(hand, dealerCard)
+
+
+class QueueClient(TableClient):
+    # Bets and decisions are pushed by another task, e.g. a connection handler
+    def __init__(self):
+        import asyncio
+        self._bets = asyncio.Queue()
+        self._decisions = asyncio.Queue()
+
+    def submitBet(self, amount):
+        self._bets.put_nowait(amount)
+
+    def submitDecision(self, hit):
+        self._decisions.put_nowait(hit)
+
+    async def getBet(self, availableBalance):
+        return await self._bets.get()
+
+    async def shouldHit(self, hand, dealerCard):
+        return await self._decisions.get()
+
+
+class Table:
+    MAX_SEATS = 7
+
+    def __init__(self, tableId, ledger, decks=6, penetration=0.75, rng=None):
+        self._tableId = tableId
+        self._ledger = ledger
+        self._shoe = Shoe(decks, penetration, rng)
+        self._dealer = Dealer(Hand())
+        self._seats = []        # List<(UserPlayer, TableClient)>
+        self._roundsPlayed = 0
+
+    def getId(self):
+        return self._tableId
+
+    def getRoundsPlayed(self):
+        return self._roundsPlayed
+
+    def join(self, player, client):
+        if len(self._seats) >= self.MAX_SEATS:
+            raise ValueError('Table is full')
+        self._seats.append((player, client))
+        return len(self._seats) - 1
+
+    async def playRound(self):
+        import asyncio
+        shoe, dealer, ledger = self._shoe, self._dealer, self._ledger
+        shoe.startRound()
+
+        # A seat whose client fails or bets more than it holds sits the round out, so no seat is
+        # charged for a round that does not go ahead and one client cannot stop the others' tables
+        bets = await asyncio.gather(*(client.getBet(ledger.getAvailableBalance(player)) for player, client in self._seats),
+                                    return_exceptions=True)
+        active = []
+        for (player, client), bet in zip(self._seats, bets):
+            if type(bet) is int and 0 < bet <= ledger.getAvailableBalance(player):
+                ledger.debit(player, bet)
+                player.clearHand()
+                active.append((player, client, bet))
+        if not active:
+            return False
+
+        dealer.clearHand()
+        for player, _, _ in active:
+            player.addCard(shoe.draw())
+        dealerCard = shoe.draw()
+        dealer.addCard(dealerCard)
+        for player, _, _ in active:
+            player.addCard(shoe.draw())
+        dealer.addCard(shoe.draw())
+
+        for player, client, _ in active:
+            while player.getHand().getScore() < 21 and await client.shouldHit(player.getHand(), dealerCard):
+                player.addCard(shoe.draw())
+
+        if any(not player.getHand().isBust() for player, _, _ in active):
+            while dealer.makeMove():
+                dealer.addCard(shoe.draw())
+        dealerScore = dealer.getHand().getScore()
+
+        for player, _, bet in active:
+            score = player.getHand().getScore()
+            if score > 21:
+                continue
+            if dealerScore > 21 or score > dealerScore:
+                ledger.credit(player, bet * 2)
+            elif score == dealerScore:
+                ledger.credit(player, bet)
+        self._roundsPlayed += 1
+        return True
+
+    async def run(self, rounds):
+        import asyncio
+        for _ in range(rounds):
+            if not await self.playRound():
+                return
+            # Let the other tables run between rounds
+            await asyncio.sleep(0)
+
+
+class TableManager:
+    def __init__(self, ledger=None):
+        self._ledger = ledger or WalletLedger()
+        self._tables = {}
+
+    def getLedger(self):
+        return self._ledger
+
+    def createTable(self, decks=6, penetration=0.75, rng=None):
+        table = Table(len(self._tables), self._ledger, decks, penetration, rng)
+        self._tables[table.getId()] = table
+        return table
+
+    def getTable(self, tableId):
+        return self._tables[tableId]
+
+    def getTables(self):
+        return list(self._tables.values())
+
+    async def run(self, rounds):
+        import asyncio
+        try:
+            await asyncio.gather(*(table.run(rounds) for table in self._tables.values()))
+        finally:
+            self._ledger.flush()
+        return sum(table.getRoundsPlayed() for table in self._tables.values())
+
+
+def benchmarkTables(tableCounts=(1, 10, 100), rounds=100, seats=Table.MAX_SEATS, seed=0):
+    import asyncio
+    strategy = BasicStrategy()
+    report = []
+    for tableCount in tableCounts:
+        manager = TableManager()
+        for t in range(tableCount):
+            table = manager.createTable(rng=random.Random(f'{seed}:{t}'))
+            for _ in range(seats):
+                table.join(UserPlayer(10 ** 9, Hand()), StrategyClient(strategy, 10))
+        start = time.perf_counter()
+        played = asyncio.run(manager.run(rounds))
+        elapsed = time.perf_counter() - start
+        report.append((tableCount, played / elapsed))
+        print(f'{tableCount} table(s) x {seats} seats: {played / elapsed:.0f} rounds/s')
+    return report
+
+
+def main():
+    player = UserPlayer(1000, Hand())
+    dealer = Dealer(Hand())
+    shoe = Shoe()
+
+    while player.getBalance() > 0:
+        gameRound = GameRound(player, dealer, shoe).play()
+
 
-while player.getBalance() > 0:
-    gameRound = GameRound(player, dealer, Deck()).play()
\ No newline at end of file
+if __name__ == '__main__':
+    main()
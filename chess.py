@@ -1,4 +1,14 @@
+import copy
+import itertools
+import math
+import mmap
+import os
+import random
+import re
+import struct
+import time
 from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
 from enum import Enum
 
 class Color(Enum):
@@ -7,9 +17,11 @@ class Color(Enum):
 
 
 class Square:
-    def __init__(self, color):
+    __slots__ = ('color', 'piece')
+
+    def __init__(self, color, piece=None):
         self.color = color
-        self.piece = None
+        self.piece = piece
 
     def get_piece(self):
         return self.piece
@@ -21,12 +33,22 @@ class Square:
         self.piece = piece
 
 class Piece(ABC):
+    # Pieces hold no position or move state, so one shared instance per (type, color) serves every
+    # board; get_piece hands those out
+    __slots__ = ('color',)
+
     def __init__(self, color):
         self.color = color
 
     def get_color(self):
         return self.color
 
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
     @staticmethod
     def is_within_grid(end_row, end_col):
         return 0 <= end_row <= 7 and 0 <= end_col <= 7
@@ -41,6 +63,8 @@ class Piece(ABC):
 
 
 class Pawn(Piece):
+    __slots__ = ()
+
     def is_valid_move(self, start_row, start_col, end_row, end_col, board):
         if not Piece.is_within_grid(end_row, end_col):
             return False
@@ -48,6 +72,10 @@ class Pawn(Piece):
         col_movement = end_col - start_col
         direction = -1 if self.get_color() == Color.WHITE else 1
 
+        if abs(col_movement) == 1 and row_movement == direction:
+            target = board[end_row][end_col].get_piece()
+            return target is not None and target.get_color() != self.get_color()
+
         if col_movement != 0:
             return False
 
@@ -70,6 +98,8 @@ class Pawn(Piece):
     
 
 class Knight(Piece):
+    __slots__ = ()
+
     def is_valid_move(self, start_row, start_col, end_row, end_col, board):
         if not Piece.is_within_grid(end_row, end_col):
             return False
@@ -158,6 +188,8 @@ class MovementUtil:
             return False
         
 class Rook(Piece):
+    __slots__ = ()
+
     def is_valid_move(self, start_row, start_col, end_row, end_col, board):
         return MovementUtil.is_valid_straight_move(start_row, start_col, end_row, end_col, self.get_color(), board)
 
@@ -165,6 +197,8 @@ class Rook(Piece):
         return 'R' if self.get_color() == Color.WHITE else 'r'
     
 class Bishop(Piece):
+    __slots__ = ()
+
     def is_valid_move(self, start_row, start_col, end_row, end_col, board):
         return MovementUtil.is_valid_diagonal_move(start_row, start_col, end_row, end_col, self.get_color(), board)
 
@@ -172,6 +206,8 @@ class Bishop(Piece):
         return 'B' if self.get_color() == Color.WHITE else 'b'
     
 class King(Piece):
+    __slots__ = ()
+
     def is_valid_move(self, start_row, start_col, end_row, end_col, board):
         if not Piece.is_within_grid(end_row, end_col):
             return False
@@ -192,6 +228,8 @@ class King(Piece):
         return 'K' if self.get_color() == Color.WHITE else 'k'
     
 class Queen(Piece):
+    __slots__ = ()
+
     def is_valid_move(self, start_row, start_col, end_row, end_col, board):
         return MovementUtil.is_valid_straight_move(start_row, start_col, end_row, end_col, self.get_color(), board) or \
                MovementUtil.is_valid_diagonal_move(start_row, start_col, end_row, end_col, self.get_color(), board)
@@ -200,11 +238,22 @@ class Queen(Piece):
         return 'Q' if self.get_color() == Color.WHITE else 'q'
 
 
+_PIECE_INSTANCES = {}
+
+
+def get_piece(piece_class, color):
+    piece = _PIECE_INSTANCES.get((piece_class, color))
+    if piece is None:
+        piece = _PIECE_INSTANCES[(piece_class, color)] = piece_class(color)
+    return piece
+
+
 class ChessBoard:
 
     def __init__(self):
         self.board = [[None for _ in range(8)] for _ in range(8)]
         self.initialize_board_and_pieces()
+        self.bitboard = BitBoard.from_chess_board(self)
 
     def initialize_board_and_pieces(self):
         for i in range(8):
@@ -217,29 +266,29 @@ class ChessBoard:
 
     def initialize_black_pieces(self):
         for i in range(8):
-            self.board[1][i].set_piece(Pawn(Color.BLACK))
+            self.board[1][i].set_piece(get_piece(Pawn, Color.BLACK))
 
-        self.board[0][0].set_piece(Rook(Color.BLACK))
-        self.board[0][7].set_piece(Rook(Color.BLACK))
-        self.board[0][1].set_piece(Knight(Color.BLACK))
-        self.board[0][6].set_piece(Knight(Color.BLACK))
-        self.board[0][2].set_piece(Bishop(Color.BLACK))
-        self.board[0][5].set_piece(Bishop(Color.BLACK))
-        self.board[0][3].set_piece(Queen(Color.BLACK))
-        self.board[0][4].set_piece(King(Color.BLACK))
+        self.board[0][0].set_piece(get_piece(Rook, Color.BLACK))
+        self.board[0][7].set_piece(get_piece(Rook, Color.BLACK))
+        self.board[0][1].set_piece(get_piece(Knight, Color.BLACK))
+        self.board[0][6].set_piece(get_piece(Knight, Color.BLACK))
+        self.board[0][2].set_piece(get_piece(Bishop, Color.BLACK))
+        self.board[0][5].set_piece(get_piece(Bishop, Color.BLACK))
+        self.board[0][3].set_piece(get_piece(Queen, Color.BLACK))
+        self.board[0][4].set_piece(get_piece(King, Color.BLACK))
 
     def initialize_white_pieces(self):
         for i in range(8):
-            self.board[6][i].set_piece(Pawn(Color.WHITE))
+            self.board[6][i].set_piece(get_piece(Pawn, Color.WHITE))
 
-        self.board[7][0].set_piece(Rook(Color.WHITE))
-        self.board[7][7].set_piece(Rook(Color.WHITE))
-        self.board[7][1].set_piece(Knight(Color.WHITE))
-        self.board[7][6].set_piece(Knight(Color.WHITE))
-        self.board[7][2].set_piece(Bishop(Color.WHITE))
-        self.board[7][5].set_piece(Bishop(Color.WHITE))
-        self.board[7][3].set_piece(Queen(Color.WHITE))
-        self.board[7][4].set_piece(King(Color.WHITE))
+        self.board[7][0].set_piece(get_piece(Rook, Color.WHITE))
+        self.board[7][7].set_piece(get_piece(Rook, Color.WHITE))
+        self.board[7][1].set_piece(get_piece(Knight, Color.WHITE))
+        self.board[7][6].set_piece(get_piece(Knight, Color.WHITE))
+        self.board[7][2].set_piece(get_piece(Bishop, Color.WHITE))
+        self.board[7][5].set_piece(get_piece(Bishop, Color.WHITE))
+        self.board[7][3].set_piece(get_piece(Queen, Color.WHITE))
+        self.board[7][4].set_piece(get_piece(King, Color.WHITE))
 
     def move_piece(self, current_player):
         while True:
@@ -261,18 +310,83 @@ class ChessBoard:
                 print("It's not your turn to move this piece.")
                 continue
 
-            if piece_to_move.is_valid_move(start_row, start_col, end_row, end_col, self.board):
-                destination_piece = self.board[end_row][end_col].get_piece()
-                if destination_piece and destination_piece.color != piece_to_move.color:
-                    self.board[end_row][end_col].set_piece(None)
-
-                self.board[end_row][end_col].set_piece(piece_to_move)
-                self.board[start_row][start_col].set_piece(None)  # Clear the original square
+            move = self.find_legal_move(start_row, start_col, end_row, end_col)
+            if move is not None:
+                if (move >> 12) & 7:
+                    choice = input("Promote to (q, r, b, n): ").strip().lower()
+                    promotion = PIECE_LETTERS.index(choice) if choice in ('q', 'r', 'b', 'n') else QUEEN
+                    move = move & ~(7 << 12) | promotion << 12
+                self.apply_move(move)
                 print(f"{piece_to_move.get_symbol()} moved to {end_row}, {end_col}")
                 return True
             else:
                 print(f"Invalid move for the {piece_to_move.get_symbol()}. Please try again.")
 
+    def move_engine_piece(self, engine_player):
+        move = engine_player.choose_move(self)
+        if move is None:
+            return False
+        piece_to_move = self.board[(move & 63) // 8][move & 7].get_piece()
+        end_row, end_col = divmod((move >> 6) & 63, 8)
+        self.apply_move(move)
+        print(f"{piece_to_move.get_symbol()} moved to {end_row}, {end_col} ({engine_player.last_result})")
+        return True
+
+    def find_legal_move(self, start_row, start_col, end_row, end_col):
+        # The bitboard mirrors the squares, so validation needs no board copy
+        start = start_row * 8 + start_col
+        end = end_row * 8 + end_col
+        for move in self.bitboard.generate_legal_moves():
+            if move & 4095 == start | end << 6:
+                return move
+        return None
+
+    def apply_move(self, move):
+        # Moves the Square pieces, including the rook when castling, the pawn taken en passant and
+        # the promoted piece, then plays the move on the bitboard
+        start_row, start_col = divmod(move & 63, 8)
+        end_row, end_col = divmod((move >> 6) & 63, 8)
+        promotion = (move >> 12) & 7
+        flag = move >> 15
+        piece = self.board[start_row][start_col].get_piece()
+        if flag == EN_PASSANT:
+            self.board[start_row][end_col].set_piece(None)
+        elif flag == CASTLING:
+            rook_start, rook_end = (7, 5) if end_col > start_col else (0, 3)
+            self.board[start_row][rook_end].set_piece(self.board[start_row][rook_start].get_piece())
+            self.board[start_row][rook_start].set_piece(None)
+        if promotion:
+            piece = get_piece(PIECE_CLASSES[promotion], piece.get_color())
+        self.board[end_row][end_col].set_piece(piece)
+        self.board[start_row][start_col].set_piece(None)
+        self.bitboard.make_move(move)
+
+    def is_in_check(self, color):
+        return self.bitboard.is_in_check(COLOR_INDEX[color])
+
+    def is_checkmate(self):
+        return self.bitboard.is_checkmate()
+
+    def is_stalemate(self):
+        return self.bitboard.is_stalemate()
+
+    def to_bitboard(self, color=Color.WHITE):
+        return BitBoard.from_chess_board(self, color)
+
+    def clone(self):
+        # Squares are copied, pieces are shared flyweights and the bitboard is a few list copies
+        board = ChessBoard.__new__(ChessBoard)
+        board.board = [[Square(square.color, square.piece) for square in row] for row in self.board]
+        board.bitboard = self.bitboard.copy()
+        return board
+
+    def get_position(self):
+        return Position.from_bitboard(self.bitboard)
+
+    def get_pseudo_legal_moves(self, color):
+        # ((start_row, start_col), (end_row, end_col)) pairs; moves may still leave the king in check
+        return [divmod(move & 63, 8) + divmod((move >> 6) & 63, 8) for move in self.to_bitboard(color).generate_pseudo_legal_moves()]
+
     def display_board(self):
         print("  0 1 2 3 4 5 6 7")
         print("  ---------------")
@@ -285,6 +399,8 @@ class ChessBoard:
 
 
 class Player:
+    __slots__ = ('color',)
+
     def __init__(self, color):
         self.color = color
     
@@ -293,27 +409,1726 @@ class Player:
     
 
 class ChessGame:
-    def __init__(self):
+    def __init__(self, white_player=None, black_player=None):
         self.board = ChessBoard()
-        self.white_player = Player(Color.WHITE)
-        self.black_player = Player(Color.BLACK)
+        self.white_player = white_player if white_player is not None else Player(Color.WHITE)
+        self.black_player = black_player if black_player is not None else Player(Color.BLACK)
         self.current_player = self.white_player
 
     def start_game(self):
         print("Welcome to Chess, UPPERCASE denotes white pieces, LOWERCASE denotes black pieces.")
         self.board.display_board()
 
-        current_player = self.white_player
-
         while True:
-            print("Current turn:" + str(current_player.get_color()))
+            print("Current turn:" + str(self.current_player.get_color()))
 
-            move_successful = self.board.move_piece(self.current_player)
+            if isinstance(self.current_player, EnginePlayer):
+                move_successful = self.board.move_engine_piece(self.current_player)
+            else:
+                move_successful = self.board.move_piece(self.current_player)
             if move_successful:
                 self.board.display_board()
                 self.current_player = self.black_player if self.current_player == self.white_player else self.white_player
+                if self.board.is_checkmate():
+                    print("Checkmate! " + str(self.current_player.get_color()) + " loses.")
+                    return
+                if self.board.is_stalemate():
+                    print("Stalemate! The game is a draw.")
+                    return
+                if self.board.is_in_check(self.current_player.get_color()):
+                    print("Check!")
             else:
                 print("Invalid move. Please try again.")
 
-game = ChessGame()
-game.start_game()
\ No newline at end of file
+
+# Bitboards: bit (row * 8 + col) stands for board[row][col], so bit 0 is a8 and bit 63 is h1
+WHITE, BLACK = 0, 1
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = range(6)
+PIECE_LETTERS = 'pnbrqk'
+PIECE_CLASSES = (Pawn, Knight, Bishop, Rook, Queen, King)
+PIECE_TYPES = {piece_class: piece_type for piece_type, piece_class in enumerate(PIECE_CLASSES)}
+COLOR_INDEX = {Color.WHITE: WHITE, Color.BLACK: BLACK}
+FULL_BOARD = (1 << 64) - 1
+ROW_MASKS = [0xFF << (8 * row) for row in range(8)]
+FILE_A = sum(1 << (8 * row) for row in range(8))
+FILE_H = FILE_A << 7
+
+# Move = from | to << 6 | promotion << 12 | flag << 15, where promotion is the piece type or 0
+NORMAL, DOUBLE_PUSH, EN_PASSANT, CASTLING = range(4)
+WHITE_KINGSIDE, WHITE_QUEENSIDE, BLACK_KINGSIDE, BLACK_QUEENSIDE = 1, 2, 4, 8
+CASTLING_MASKS = [15] * 64
+CASTLING_MASKS[60] = 15 & ~(WHITE_KINGSIDE | WHITE_QUEENSIDE)
+CASTLING_MASKS[63] = 15 & ~WHITE_KINGSIDE
+CASTLING_MASKS[56] = 15 & ~WHITE_QUEENSIDE
+CASTLING_MASKS[4] = 15 & ~(BLACK_KINGSIDE | BLACK_QUEENSIDE)
+CASTLING_MASKS[7] = 15 & ~BLACK_KINGSIDE
+CASTLING_MASKS[0] = 15 & ~BLACK_QUEENSIDE
+START_FEN = 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1'
+
+# Zobrist keys from a fixed seed, so position keys are stable across runs and processes
+_zobrist_random = random.Random(20240101)
+ZOBRIST_PIECES = [[_zobrist_random.getrandbits(64) for _ in range(64)] for _ in range(12)]
+ZOBRIST_CASTLING = [_zobrist_random.getrandbits(64) for _ in range(16)]
+ZOBRIST_EN_PASSANT = [_zobrist_random.getrandbits(64) for _ in range(64)] + [0]
+ZOBRIST_SIDE = _zobrist_random.getrandbits(64)
+
+
+def encode_move(start, end, promotion=0, flag=NORMAL):
+    return start | end << 6 | promotion << 12 | flag << 15
+
+
+def square_name(square):
+    return 'abcdefgh'[square & 7] + str(8 - (square >> 3))
+
+
+def parse_square(name):
+    return (8 - int(name[1])) * 8 + 'abcdefgh'.index(name[0])
+
+
+def move_to_uci(move):
+    promotion = (move >> 12) & 7
+    return square_name(move & 63) + square_name((move >> 6) & 63) + (PIECE_LETTERS[promotion] if promotion else '')
+
+
+def _step_attacks(deltas):
+    table = []
+    for square in range(64):
+        row, col = divmod(square, 8)
+        attacks = 0
+        for row_delta, col_delta in deltas:
+            r, c = row + row_delta, col + col_delta
+            if 0 <= r <= 7 and 0 <= c <= 7:
+                attacks |= 1 << (r * 8 + c)
+        table.append(attacks)
+    return table
+
+
+def _ray_table(row_delta, col_delta):
+    table = []
+    for square in range(64):
+        row, col = divmod(square, 8)
+        ray = 0
+        r, c = row + row_delta, col + col_delta
+        while 0 <= r <= 7 and 0 <= c <= 7:
+            ray |= 1 << (r * 8 + c)
+            r, c = r + row_delta, c + col_delta
+        table.append(ray)
+    # Rays towards higher bit indices meet their first blocker at the lowest set bit
+    return table, row_delta * 8 + col_delta > 0
+
+
+KNIGHT_ATTACKS = _step_attacks(((-2, -1), (-2, 1), (-1, -2), (-1, 2), (1, -2), (1, 2), (2, -1), (2, 1)))
+KING_ATTACKS = _step_attacks(((-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)))
+PAWN_ATTACKS = (_step_attacks(((-1, -1), (-1, 1))), _step_attacks(((1, -1), (1, 1))))
+ROOK_RAYS = tuple(_ray_table(*direction) for direction in ((-1, 0), (1, 0), (0, -1), (0, 1)))
+BISHOP_RAYS = tuple(_ray_table(*direction) for direction in ((-1, -1), (-1, 1), (1, -1), (1, 1)))
+
+
+def _between_table():
+    # BETWEEN[a][b] holds the squares strictly between a and b when they share a line, else 0
+    table = [[0] * 64 for _ in range(64)]
+    for rays in (ROOK_RAYS, BISHOP_RAYS):
+        for ray_table, positive in rays:
+            for square in range(64):
+                between = 0
+                ray = ray_table[square]
+                while ray:
+                    bit = ray & -ray if positive else 1 << (ray.bit_length() - 1)
+                    ray ^= bit
+                    table[square][bit.bit_length() - 1] = between
+                    between |= bit
+    return table
+
+
+BETWEEN = _between_table()
+
+
+def slider_attacks(square, occupied, rays):
+    # Classical ray attacks: cut each ray behind its first blocker
+    attacks = 0
+    for table, positive in rays:
+        ray = table[square]
+        blockers = ray & occupied
+        if blockers:
+            blocker = (blockers & -blockers).bit_length() - 1 if positive else blockers.bit_length() - 1
+            ray ^= table[blocker]
+        attacks |= ray
+    return attacks
+
+
+class BitBoard:
+    __slots__ = ('pieces', 'occupancy', 'mailbox', 'side', 'castling', 'en_passant', 'halfmove_clock',
+                 'fullmove_number', 'key', 'history')
+
+    def __init__(self):
+        self.pieces = [0] * 12          # Indexed by color * 6 + piece type
+        self.occupancy = [0, 0]
+        self.mailbox = [-1] * 64        # Piece index on each square, -1 when empty
+        self.side = WHITE
+        self.castling = 0
+        self.en_passant = -1
+        self.halfmove_clock = 0
+        self.fullmove_number = 1
+        self.key = 0                    # Zobrist key, updated incrementally
+        self.history = []
+
+    @classmethod
+    def from_fen(cls, fen):
+        fields = fen.split()
+        bitboard = cls()
+        for row, rank in enumerate(fields[0].split('/')):
+            col = 0
+            for char in rank:
+                if char.isdigit():
+                    col += int(char)
+                else:
+                    color = WHITE if char.isupper() else BLACK
+                    bitboard.put_piece(row * 8 + col, color * 6 + PIECE_LETTERS.index(char.lower()))
+                    col += 1
+        bitboard.side = WHITE if len(fields) < 2 or fields[1] == 'w' else BLACK
+        if len(fields) > 2:
+            for char, right in zip('KQkq', (WHITE_KINGSIDE, WHITE_QUEENSIDE, BLACK_KINGSIDE, BLACK_QUEENSIDE)):
+                if char in fields[2]:
+                    bitboard.castling |= right
+        if len(fields) > 3 and fields[3] != '-':
+            bitboard.en_passant = parse_square(fields[3])
+        if len(fields) > 5:
+            bitboard.halfmove_clock = int(fields[4])
+            bitboard.fullmove_number = int(fields[5])
+        bitboard.key = bitboard.compute_key()
+        return bitboard
+
+    @classmethod
+    def from_chess_board(cls, chess_board, color=Color.WHITE):
+        # Castling rights are inferred from kings and rooks still on their starting squares
+        bitboard = cls()
+        for row in range(8):
+            for col in range(8):
+                piece = chess_board.board[row][col].get_piece()
+                if piece is not None:
+                    bitboard.put_piece(row * 8 + col, COLOR_INDEX[piece.get_color()] * 6 + PIECE_TYPES[type(piece)])
+        bitboard.side = COLOR_INDEX[color]
+        for right, king_square, rook_square, color_index in ((WHITE_KINGSIDE, 60, 63, WHITE), (WHITE_QUEENSIDE, 60, 56, WHITE),
+                                                             (BLACK_KINGSIDE, 4, 7, BLACK), (BLACK_QUEENSIDE, 4, 0, BLACK)):
+            if bitboard.mailbox[king_square] == color_index * 6 + KING and bitboard.mailbox[rook_square] == color_index * 6 + ROOK:
+                bitboard.castling |= right
+        bitboard.key = bitboard.compute_key()
+        return bitboard
+
+    def to_fen(self):
+        rows = []
+        for row in range(8):
+            text = ''
+            empty = 0
+            for piece in self.mailbox[row * 8:row * 8 + 8]:
+                if piece < 0:
+                    empty += 1
+                    continue
+                if empty:
+                    text += str(empty)
+                    empty = 0
+                text += PIECE_LETTERS[piece % 6].upper() if piece < 6 else PIECE_LETTERS[piece % 6]
+            rows.append(text + (str(empty) if empty else ''))
+        castling = ''.join(char for char, right in zip('KQkq', (WHITE_KINGSIDE, WHITE_QUEENSIDE, BLACK_KINGSIDE, BLACK_QUEENSIDE))
+                           if self.castling & right) or '-'
+        en_passant = square_name(self.en_passant) if self.en_passant >= 0 else '-'
+        return f"{'/'.join(rows)} {'wb'[self.side]} {castling} {en_passant} {self.halfmove_clock} {self.fullmove_number}"
+
+    def copy(self):
+        bitboard = BitBoard.__new__(BitBoard)
+        bitboard.pieces = self.pieces[:]
+        bitboard.occupancy = self.occupancy[:]
+        bitboard.mailbox = self.mailbox[:]
+        bitboard.side = self.side
+        bitboard.castling = self.castling
+        bitboard.en_passant = self.en_passant
+        bitboard.halfmove_clock = self.halfmove_clock
+        bitboard.fullmove_number = self.fullmove_number
+        bitboard.key = self.key
+        bitboard.history = self.history[:]
+        return bitboard
+
+    def compute_key(self):
+        key = ZOBRIST_CASTLING[self.castling] ^ ZOBRIST_EN_PASSANT[self.en_passant]
+        if self.side == BLACK:
+            key ^= ZOBRIST_SIDE
+        for square, piece in enumerate(self.mailbox):
+            if piece >= 0:
+                key ^= ZOBRIST_PIECES[piece][square]
+        return key
+
+    def put_piece(self, square, piece):
+        bit = 1 << square
+        self.pieces[piece] |= bit
+        self.occupancy[piece // 6] |= bit
+        self.mailbox[square] = piece
+        self.key ^= ZOBRIST_PIECES[piece][square]
+
+    def remove_piece(self, square):
+        piece = self.mailbox[square]
+        bit = 1 << square
+        self.pieces[piece] ^= bit
+        self.occupancy[piece // 6] ^= bit
+        self.mailbox[square] = -1
+        self.key ^= ZOBRIST_PIECES[piece][square]
+        return piece
+
+    def get_king_square(self, color):
+        return self.pieces[color * 6 + KING].bit_length() - 1
+
+    def is_square_attacked(self, square, by_color):
+        pieces = self.pieces
+        base = by_color * 6
+        if PAWN_ATTACKS[by_color ^ 1][square] & pieces[base + PAWN] or \
+           KNIGHT_ATTACKS[square] & pieces[base + KNIGHT] or \
+           KING_ATTACKS[square] & pieces[base + KING]:
+            return True
+        occupied = self.occupancy[0] | self.occupancy[1]
+        queens = pieces[base + QUEEN]
+        return bool(slider_attacks(square, occupied, BISHOP_RAYS) & (pieces[base + BISHOP] | queens) or
+                    slider_attacks(square, occupied, ROOK_RAYS) & (pieces[base + ROOK] | queens))
+
+    def is_in_check(self, color=None):
+        color = self.side if color is None else color
+        return self.is_square_attacked(self.get_king_square(color), color ^ 1)
+
+    def get_attack_map(self, color, occupied=None):
+        # Every square the color attacks; pass occupied without the defending king to see through it
+        pieces = self.pieces
+        base = color * 6
+        if occupied is None:
+            occupied = self.occupancy[0] | self.occupancy[1]
+        pawns = pieces[base + PAWN]
+        if color == WHITE:
+            attacks = (pawns >> 9) & ~FILE_H | (pawns >> 7) & ~FILE_A
+        else:
+            attacks = ((pawns << 7) & ~FILE_H | (pawns << 9) & ~FILE_A) & FULL_BOARD
+        for piece_type, table in ((KNIGHT, KNIGHT_ATTACKS), (KING, KING_ATTACKS)):
+            remaining = pieces[base + piece_type]
+            while remaining:
+                bit = remaining & -remaining
+                remaining ^= bit
+                attacks |= table[bit.bit_length() - 1]
+        queens = pieces[base + QUEEN]
+        for sliders, rays in ((pieces[base + BISHOP] | queens, BISHOP_RAYS), (pieces[base + ROOK] | queens, ROOK_RAYS)):
+            while sliders:
+                bit = sliders & -sliders
+                sliders ^= bit
+                attacks |= slider_attacks(bit.bit_length() - 1, occupied, rays)
+        return attacks
+
+    def get_checkers(self, color=None):
+        # Bitboard of enemy pieces giving check to the color's king
+        color = self.side if color is None else color
+        king = self.get_king_square(color)
+        pieces = self.pieces
+        base = (color ^ 1) * 6
+        occupied = self.occupancy[0] | self.occupancy[1]
+        queens = pieces[base + QUEEN]
+        return PAWN_ATTACKS[color][king] & pieces[base + PAWN] | \
+            KNIGHT_ATTACKS[king] & pieces[base + KNIGHT] | \
+            slider_attacks(king, occupied, BISHOP_RAYS) & (pieces[base + BISHOP] | queens) | \
+            slider_attacks(king, occupied, ROOK_RAYS) & (pieces[base + ROOK] | queens)
+
+    def get_pins(self, color=None):
+        # Map of pinned square -> squares that piece may still move to (the pin line up to the pinner)
+        color = self.side if color is None else color
+        king = self.get_king_square(color)
+        pieces = self.pieces
+        base = (color ^ 1) * 6
+        own = self.occupancy[color]
+        enemy = self.occupancy[color ^ 1]
+        queens = pieces[base + QUEEN]
+        pinned = {}
+        for sliders, rays in ((pieces[base + BISHOP] | queens, BISHOP_RAYS), (pieces[base + ROOK] | queens, ROOK_RAYS)):
+            # Pinners are sliders the king would see if only enemy pieces blocked
+            pinners = slider_attacks(king, enemy, rays) & sliders
+            while pinners:
+                bit = pinners & -pinners
+                pinners ^= bit
+                between = BETWEEN[king][bit.bit_length() - 1]
+                blockers = between & own
+                if blockers and not blockers & (blockers - 1):
+                    pinned[blockers.bit_length() - 1] = between | bit
+        return pinned
+
+    def generate_pseudo_legal_moves(self):
+        moves = []
+        own = self.occupancy[self.side]
+        self._generate_piece_moves(moves, FULL_BOARD, {})
+        king = self.get_king_square(self.side)
+        targets = KING_ATTACKS[king] & ~own
+        while targets:
+            bit = targets & -targets
+            targets ^= bit
+            moves.append(king | (bit.bit_length() - 1) << 6)
+        self._generate_castling(moves, self.get_attack_map(self.side ^ 1))
+        return moves
+
+    def generate_legal_moves(self):
+        # King moves avoid the enemy attack map computed through the king; in check, other pieces must
+        # capture the checker or block; pinned pieces stay on their pin line
+        moves = []
+        side = self.side
+        king = self.get_king_square(side)
+        king_bit = 1 << king
+        occupied = self.occupancy[0] | self.occupancy[1]
+        danger = self.get_attack_map(side ^ 1, occupied ^ king_bit)
+        targets = KING_ATTACKS[king] & ~self.occupancy[side] & ~danger
+        while targets:
+            bit = targets & -targets
+            targets ^= bit
+            moves.append(king | (bit.bit_length() - 1) << 6)
+        checkers = self.get_checkers(side)
+        if checkers & (checkers - 1):
+            return moves
+        if checkers:
+            target_mask = checkers | BETWEEN[king][checkers.bit_length() - 1]
+        else:
+            target_mask = FULL_BOARD
+            self._generate_castling(moves, danger)
+        self._generate_piece_moves(moves, target_mask, self.get_pins(side), True)
+        return moves
+
+    def _generate_piece_moves(self, moves, target_mask, pinned, legal=False):
+        append = moves.append
+        side = self.side
+        base = side * 6
+        pieces = self.pieces
+        own = self.occupancy[side]
+        enemy = self.occupancy[side ^ 1]
+        occupied = own | enemy
+        empty = ~occupied & FULL_BOARD
+
+        # Pawn pushes, as whole-board shifts
+        pawns = pieces[base + PAWN]
+        if side == WHITE:
+            single = (pawns >> 8) & empty
+            double = ((single & ROW_MASKS[5]) >> 8) & empty & target_mask
+            step, promotion_row = 8, ROW_MASKS[0]
+        else:
+            single = (pawns << 8) & empty
+            double = ((single & ROW_MASKS[2]) << 8) & empty & target_mask
+            step, promotion_row = -8, ROW_MASKS[7]
+        targets = single & target_mask
+        while targets:
+            bit = targets & -targets
+            targets ^= bit
+            end = bit.bit_length() - 1
+            start = end + step
+            if start in pinned and not bit & pinned[start]:
+                continue
+            if bit & promotion_row:
+                for promotion in (QUEEN, ROOK, BISHOP, KNIGHT):
+                    append(start | end << 6 | promotion << 12)
+            else:
+                append(start | end << 6)
+        while double:
+            bit = double & -double
+            double ^= bit
+            end = bit.bit_length() - 1
+            start = end + 2 * step
+            if start in pinned and not bit & pinned[start]:
+                continue
+            append(start | end << 6 | DOUBLE_PUSH << 15)
+
+        # Pawn captures; en passant is rare and can expose the king along the row, so a legal
+        # generator checks it by playing it
+        attack_table = PAWN_ATTACKS[side]
+        en_passant_bit = 1 << self.en_passant if self.en_passant >= 0 else 0
+        while pawns:
+            bit = pawns & -pawns
+            pawns ^= bit
+            start = bit.bit_length() - 1
+            targets = attack_table[start] & (enemy & target_mask | en_passant_bit)
+            if start in pinned:
+                targets &= pinned[start]
+            while targets:
+                target_bit = targets & -targets
+                targets ^= target_bit
+                end = target_bit.bit_length() - 1
+                if target_bit == en_passant_bit:
+                    move = start | end << 6 | EN_PASSANT << 15
+                    if legal:
+                        self.make_move(move)
+                        exposed = self.is_square_attacked(self.get_king_square(side), side ^ 1)
+                        self.unmake_move()
+                        if exposed:
+                            continue
+                    append(move)
+                elif target_bit & promotion_row:
+                    for promotion in (QUEEN, ROOK, BISHOP, KNIGHT):
+                        append(start | end << 6 | promotion << 12)
+                else:
+                    append(start | end << 6)
+
+        # Knights and sliders; a pinned knight can never move
+        mask = ~own & target_mask
+        for piece_type in (KNIGHT, BISHOP, ROOK, QUEEN):
+            remaining = pieces[base + piece_type]
+            while remaining:
+                bit = remaining & -remaining
+                remaining ^= bit
+                start = bit.bit_length() - 1
+                if piece_type == KNIGHT:
+                    targets = KNIGHT_ATTACKS[start]
+                elif piece_type == BISHOP:
+                    targets = slider_attacks(start, occupied, BISHOP_RAYS)
+                elif piece_type == ROOK:
+                    targets = slider_attacks(start, occupied, ROOK_RAYS)
+                else:
+                    targets = slider_attacks(start, occupied, BISHOP_RAYS) | slider_attacks(start, occupied, ROOK_RAYS)
+                targets &= mask
+                if start in pinned:
+                    targets &= pinned[start]
+                while targets:
+                    target_bit = targets & -targets
+                    targets ^= target_bit
+                    append(start | (target_bit.bit_length() - 1) << 6)
+
+    def _generate_castling(self, moves, danger):
+        # The king may not start in, pass through or land on an attacked square
+        occupied = self.occupancy[0] | self.occupancy[1]
+        if self.side == WHITE:
+            if self.castling & WHITE_KINGSIDE and not occupied & (3 << 61) and not danger & (7 << 60):
+                moves.append(60 | 62 << 6 | CASTLING << 15)
+            if self.castling & WHITE_QUEENSIDE and not occupied & (7 << 57) and not danger & (7 << 58):
+                moves.append(60 | 58 << 6 | CASTLING << 15)
+        else:
+            if self.castling & BLACK_KINGSIDE and not occupied & (3 << 5) and not danger & (7 << 4):
+                moves.append(4 | 6 << 6 | CASTLING << 15)
+            if self.castling & BLACK_QUEENSIDE and not occupied & (7 << 1) and not danger & (7 << 2):
+                moves.append(4 | 2 << 6 | CASTLING << 15)
+
+    def is_legal(self, move):
+        # Validates one move in place with make/unmake, without copying the board
+        if move not in self.generate_pseudo_legal_moves():
+            return False
+        side = self.side
+        self.make_move(move)
+        legal = not self.is_square_attacked(self.get_king_square(side), side ^ 1)
+        self.unmake_move()
+        return legal
+
+    def is_checkmate(self):
+        return self.is_in_check() and not self.generate_legal_moves()
+
+    def is_stalemate(self):
+        return not self.is_in_check() and not self.generate_legal_moves()
+
+    def make_move(self, move):
+        start = move & 63
+        end = (move >> 6) & 63
+        promotion = (move >> 12) & 7
+        flag = move >> 15
+        side = self.side
+        piece = self.mailbox[start]
+        captured_square = end
+        if flag == EN_PASSANT:
+            captured_square = end + 8 if side == WHITE else end - 8
+        captured = self.mailbox[captured_square]
+        self.history.append((move, captured, self.castling, self.en_passant, self.halfmove_clock, self.key))
+
+        if captured >= 0:
+            self.remove_piece(captured_square)
+        self.remove_piece(start)
+        self.put_piece(end, side * 6 + promotion if promotion else piece)
+        if flag == CASTLING:
+            rook_start, rook_end = (end + 1, end - 1) if end > start else (end - 2, end + 1)
+            self.put_piece(rook_end, self.remove_piece(rook_start))
+
+        self.key ^= ZOBRIST_CASTLING[self.castling] ^ ZOBRIST_EN_PASSANT[self.en_passant] ^ ZOBRIST_SIDE
+        self.castling &= CASTLING_MASKS[start] & CASTLING_MASKS[end]
+        self.en_passant = (start + end) >> 1 if flag == DOUBLE_PUSH else -1
+        self.key ^= ZOBRIST_CASTLING[self.castling] ^ ZOBRIST_EN_PASSANT[self.en_passant]
+        self.halfmove_clock = 0 if captured >= 0 or piece % 6 == PAWN else self.halfmove_clock + 1
+        if side == BLACK:
+            self.fullmove_number += 1
+        self.side = side ^ 1
+
+    def unmake_move(self):
+        move, captured, self.castling, self.en_passant, self.halfmove_clock, key = self.history.pop()
+        start = move & 63
+        end = (move >> 6) & 63
+        promotion = (move >> 12) & 7
+        flag = move >> 15
+        side = self.side ^ 1
+        self.side = side
+        if side == BLACK:
+            self.fullmove_number -= 1
+
+        piece = self.remove_piece(end)
+        self.put_piece(start, side * 6 + PAWN if promotion else piece)
+        if flag == CASTLING:
+            rook_start, rook_end = (end + 1, end - 1) if end > start else (end - 2, end + 1)
+            self.put_piece(rook_start, self.remove_piece(rook_end))
+        if captured >= 0:
+            self.put_piece((end + 8 if side == WHITE else end - 8) if flag == EN_PASSANT else end, captured)
+        self.key = key
+
+    def is_repetition(self):
+        # The position occurred before since the last capture or pawn move
+        key = self.key
+        history = self.history
+        for index in range(len(history) - 2, max(len(history) - self.halfmove_clock, 0) - 1, -2):
+            if history[index][5] == key:
+                return True
+        return False
+
+    def count_repetitions(self):
+        # Earlier occurrences of the position since the last capture or pawn move
+        key = self.key
+        history = self.history
+        return sum(1 for index in range(len(history) - 2, max(len(history) - self.halfmove_clock, 0) - 1, -2)
+                   if history[index][5] == key)
+
+    def is_insufficient_material(self):
+        # Bare kings, or a single minor piece left on the board
+        pieces = self.pieces
+        if pieces[PAWN] | pieces[ROOK] | pieces[QUEEN] | pieces[6 + PAWN] | pieces[6 + ROOK] | pieces[6 + QUEEN]:
+            return False
+        minors = pieces[KNIGHT] | pieces[BISHOP] | pieces[6 + KNIGHT] | pieces[6 + BISHOP]
+        return not minors & (minors - 1)
+
+    def perft(self, depth):
+        # Leaf nodes reachable in depth plies, counting the last ply in bulk
+        moves = self.generate_legal_moves()
+        if depth <= 1:
+            return len(moves) if depth == 1 else 1
+        nodes = 0
+        for move in moves:
+            self.make_move(move)
+            nodes += self.perft(depth - 1)
+            self.unmake_move()
+        return nodes
+
+    def divide(self, depth):
+        counts = {}
+        for move in self.generate_legal_moves():
+            self.make_move(move)
+            counts[move_to_uci(move)] = self.perft(depth - 1)
+            self.unmake_move()
+        return counts
+
+
+PERFT_SUITE = (
+    (START_FEN, (20, 400, 8902, 197281, 4865609)),
+    ('r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1', (48, 2039, 97862, 4085603)),
+    ('8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1', (14, 191, 2812, 43238, 674624)),
+    ('r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1', (6, 264, 9467, 422333)),
+    ('rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8', (44, 1486, 62379, 2103487)),
+)
+
+
+def run_perft_suite(max_depth=3, board_class=BitBoard):
+    # Returns (fen, depth, expected, counted, seconds) rows and overall nodes per second
+    results = []
+    total_nodes = total_seconds = 0
+    for fen, counts in PERFT_SUITE:
+        for depth, expected in enumerate(counts[:max_depth], 1):
+            bitboard = board_class.from_fen(fen)
+            start = time.perf_counter()
+            counted = bitboard.perft(depth)
+            seconds = time.perf_counter() - start
+            results.append((fen, depth, expected, counted, seconds))
+            total_nodes += counted
+            total_seconds += seconds
+    return results, total_nodes / total_seconds if total_seconds else 0.0
+
+
+class Position:
+    # Immutable position packed into 37 bytes: 32 bytes of square nibbles (piece index + 1, 0 when
+    # empty), then side and castling, en passant square (64 when none), halfmove clock and a two-byte
+    # fullmove number. Equal positions compare and hash equal
+    __slots__ = ('_data',)
+
+    def __init__(self, data):
+        self._data = bytes(data)
+
+    @classmethod
+    def from_bitboard(cls, bitboard):
+        mailbox = bitboard.mailbox
+        squares = bytes((mailbox[square] + 1) | (mailbox[square + 1] + 1) << 4 for square in range(0, 64, 2))
+        en_passant = bitboard.en_passant if bitboard.en_passant >= 0 else 64
+        return cls(squares + bytes((bitboard.side | bitboard.castling << 1, en_passant, min(bitboard.halfmove_clock, 255))) +
+                   bitboard.fullmove_number.to_bytes(2, 'little'))
+
+    @classmethod
+    def from_fen(cls, fen):
+        return cls.from_bitboard(BitBoard.from_fen(fen))
+
+    def to_bitboard(self):
+        data = self._data
+        bitboard = BitBoard()
+        for index in range(32):
+            packed = data[index]
+            if packed & 15:
+                bitboard.put_piece(2 * index, (packed & 15) - 1)
+            if packed >> 4:
+                bitboard.put_piece(2 * index + 1, (packed >> 4) - 1)
+        bitboard.side = data[32] & 1
+        bitboard.castling = data[32] >> 1
+        bitboard.en_passant = data[33] if data[33] < 64 else -1
+        bitboard.halfmove_clock = data[34]
+        bitboard.fullmove_number = int.from_bytes(data[35:37], 'little')
+        bitboard.key = bitboard.compute_key()
+        return bitboard
+
+    def to_fen(self):
+        return self.to_bitboard().to_fen()
+
+    def to_bytes(self):
+        return self._data
+
+    def get_side(self):
+        return Color.WHITE if self._data[32] & 1 == WHITE else Color.BLACK
+
+    def __eq__(self, other):
+        return isinstance(other, Position) and self._data == other._data
+
+    def __hash__(self):
+        return hash(self._data)
+
+    def __repr__(self):
+        return f"Position('{self.to_fen()}')"
+
+
+def move_to_san(bitboard, move, legal_moves=None):
+    start = move & 63
+    end = (move >> 6) & 63
+    promotion = (move >> 12) & 7
+    flag = move >> 15
+    mailbox = bitboard.mailbox
+    piece_type = mailbox[start] % 6
+    if flag == CASTLING:
+        san = 'O-O' if end > start else 'O-O-O'
+    elif piece_type == PAWN:
+        capture = mailbox[end] >= 0 or flag == EN_PASSANT
+        san = (square_name(start)[0] + 'x' if capture else '') + square_name(end) + \
+            ('=' + PIECE_LETTERS[promotion].upper() if promotion else '')
+    else:
+        # Disambiguate by file, then rank, then both, against same-type pieces reaching the square
+        if legal_moves is None:
+            legal_moves = bitboard.generate_legal_moves()
+        rivals = [other & 63 for other in legal_moves
+                  if (other >> 6) & 63 == end and other & 63 != start and mailbox[other & 63] == mailbox[start]]
+        origin = square_name(start)
+        if not rivals:
+            disambiguation = ''
+        elif all(rival & 7 != start & 7 for rival in rivals):
+            disambiguation = origin[0]
+        elif all(rival >> 3 != start >> 3 for rival in rivals):
+            disambiguation = origin[1]
+        else:
+            disambiguation = origin
+        san = PIECE_LETTERS[piece_type].upper() + disambiguation + ('x' if mailbox[end] >= 0 else '') + square_name(end)
+    bitboard.make_move(move)
+    if bitboard.is_in_check():
+        san += '#' if not bitboard.generate_legal_moves() else '+'
+    bitboard.unmake_move()
+    return san
+
+
+def parse_san(bitboard, san):
+    # Returns the legal move written as san (check marks and annotations optional), or None
+    wanted = san.rstrip('+#!?').replace('0-0-0', 'O-O-O').replace('0-0', 'O-O')
+    legal_moves = bitboard.generate_legal_moves()
+    for move in legal_moves:
+        if move_to_san(bitboard, move, legal_moves).rstrip('+#') == wanted:
+            return move
+    return None
+
+
+# Search: material plus piece-square bonuses, tables written from white's side with row 0 as rank 8
+PIECE_VALUES = (100, 320, 330, 500, 900, 0)
+PIECE_SQUARE_TABLES = (
+    (0, 0, 0, 0, 0, 0, 0, 0, 50, 50, 50, 50, 50, 50, 50, 50, 10, 10, 20, 30, 30, 20, 10, 10, 5, 5, 10, 25, 25, 10, 5, 5,
+     0, 0, 0, 20, 20, 0, 0, 0, 5, -5, -10, 0, 0, -10, -5, 5, 5, 10, 10, -20, -20, 10, 10, 5, 0, 0, 0, 0, 0, 0, 0, 0),
+    (-50, -40, -30, -30, -30, -30, -40, -50, -40, -20, 0, 0, 0, 0, -20, -40, -30, 0, 10, 15, 15, 10, 0, -30,
+     -30, 5, 15, 20, 20, 15, 5, -30, -30, 0, 15, 20, 20, 15, 0, -30, -30, 5, 10, 15, 15, 10, 5, -30,
+     -40, -20, 0, 5, 5, 0, -20, -40, -50, -40, -30, -30, -30, -30, -40, -50),
+    (-20, -10, -10, -10, -10, -10, -10, -20, -10, 0, 0, 0, 0, 0, 0, -10, -10, 0, 5, 10, 10, 5, 0, -10,
+     -10, 5, 5, 10, 10, 5, 5, -10, -10, 0, 10, 10, 10, 10, 0, -10, -10, 10, 10, 10, 10, 10, 10, -10,
+     -10, 5, 0, 0, 0, 0, 5, -10, -20, -10, -10, -10, -10, -10, -10, -20),
+    (0, 0, 0, 0, 0, 0, 0, 0, 5, 10, 10, 10, 10, 10, 10, 5, -5, 0, 0, 0, 0, 0, 0, -5, -5, 0, 0, 0, 0, 0, 0, -5,
+     -5, 0, 0, 0, 0, 0, 0, -5, -5, 0, 0, 0, 0, 0, 0, -5, -5, 0, 0, 0, 0, 0, 0, -5, 0, 0, 0, 5, 5, 0, 0, 0),
+    (-20, -10, -10, -5, -5, -10, -10, -20, -10, 0, 0, 0, 0, 0, 0, -10, -10, 0, 5, 5, 5, 5, 0, -10, -5, 0, 5, 5, 5, 5, 0, -5,
+     0, 0, 5, 5, 5, 5, 0, -5, -10, 5, 5, 5, 5, 5, 0, -10, -10, 0, 5, 0, 0, 0, 0, -10, -20, -10, -10, -5, -5, -10, -10, -20),
+    (-30, -40, -40, -50, -50, -40, -40, -30, -30, -40, -40, -50, -50, -40, -40, -30, -30, -40, -40, -50, -50, -40, -40, -30,
+     -30, -40, -40, -50, -50, -40, -40, -30, -20, -30, -30, -40, -40, -30, -30, -20, -10, -20, -20, -20, -20, -20, -20, -10,
+     20, 20, 0, 0, 0, 0, 20, 20, 20, 30, 10, 0, 0, 10, 30, 20),
+)
+# Value plus bonus per piece index and square; black reads the white table mirrored top to bottom
+_PIECE_SQUARE_SCORES = [[PIECE_VALUES[piece % 6] + PIECE_SQUARE_TABLES[piece % 6][square if piece < 6 else square ^ 56]
+                         for square in range(64)] for piece in range(12)]
+MATE_SCORE = 100000
+INFINITY = 1000000
+EXACT, LOWER_BOUND, UPPER_BOUND = range(3)
+
+
+def evaluate(bitboard):
+    # Static score in centipawns from the side to move's point of view
+    score = 0
+    pieces = bitboard.pieces
+    for piece in range(12):
+        bits = pieces[piece]
+        table = _PIECE_SQUARE_SCORES[piece]
+        total = 0
+        while bits:
+            bit = bits & -bits
+            bits ^= bit
+            total += table[bit.bit_length() - 1]
+        score += total if piece < 6 else -total
+    return score if bitboard.side == WHITE else -score
+
+
+class TranspositionTable:
+    # Fixed number of slots indexed by the low key bits, so memory stays bounded. A slot is replaced
+    # when empty, holding the same position, left over from an earlier search, or searched less deeply
+    def __init__(self, size=1 << 18):
+        self._mask = size - 1
+        self._slots = [None] * size
+        self._generation = 0
+
+    def new_search(self):
+        self._generation += 1
+
+    def probe(self, key):
+        entry = self._slots[key & self._mask]
+        return entry if entry is not None and entry[0] == key else None
+
+    def store(self, key, depth, score, flag, move):
+        index = key & self._mask
+        entry = self._slots[index]
+        if entry is None or entry[0] == key or entry[5] != self._generation or depth >= entry[1]:
+            self._slots[index] = (key, depth, score, flag, move, self._generation)
+
+    def clear(self):
+        self._slots = [None] * len(self._slots)
+
+    def get_size(self):
+        return len(self._slots)
+
+
+class _SearchTimeout(Exception):
+    pass
+
+
+class SearchResult:
+    def __init__(self, best_move, score, depth, nodes, seconds, principal_variation):
+        self.best_move = best_move
+        self.score = score
+        self.depth = depth
+        self.nodes = nodes
+        self.seconds = seconds
+        self.principal_variation = principal_variation
+
+    def get_best_move(self):
+        return self.best_move
+
+    def get_score(self):
+        return self.score
+
+    def get_depth(self):
+        return self.depth
+
+    def get_nodes(self):
+        return self.nodes
+
+    def get_nodes_per_second(self):
+        return self.nodes / self.seconds if self.seconds else 0.0
+
+    def get_principal_variation(self):
+        return self.principal_variation
+
+    def __str__(self):
+        if abs(self.score) >= MATE_SCORE - 1000:
+            plies = MATE_SCORE - abs(self.score)
+            score = f"mate {(plies + 1) // 2 if self.score > 0 else -((plies + 1) // 2)}"
+        else:
+            score = f"cp {self.score}"
+        return f"depth {self.depth} score {score} nodes {self.nodes} nps {self.get_nodes_per_second():.0f} " \
+               f"time {self.seconds * 1000:.0f} pv {' '.join(move_to_uci(move) for move in self.principal_variation)}"
+
+
+class SearchEngine:
+    # Iterative-deepening alpha-beta with quiescence search, a transposition table, check extensions
+    # and move ordering by table move, MVV-LVA, killer moves and history
+    def __init__(self, table_size=1 << 18, info_callback=None, book=None, position_cache=None, cache_min_depth=4):
+        self._table = TranspositionTable(table_size)
+        self._info_callback = info_callback
+        self._book = book
+        self._position_cache = position_cache
+        self._cache_min_depth = cache_min_depth
+        self._killers = [[0, 0] for _ in range(128)]
+        self._history = [0] * 4096
+        self._nodes = 0
+        self._deadline = None
+
+    def get_table(self):
+        return self._table
+
+    def close(self):
+        # Writes pending position cache entries and releases the book and cache files
+        if self._book is not None:
+            self._book.close()
+            self._book = None
+        if self._position_cache is not None:
+            self._position_cache.close()
+            self._position_cache = None
+
+    def search(self, bitboard, max_depth=64, time_limit=None):
+        # Returns the result of the deepest completed iteration; time_limit is wall-clock seconds.
+        # Book moves and cached results deep enough for the request skip the search
+        start = time.perf_counter()
+        if self._book is not None:
+            move = self._book.choose_move(bitboard)
+            if move is not None:
+                return SearchResult(move, 0, 0, 0, time.perf_counter() - start, [move])
+        if self._position_cache is not None:
+            entry = self._position_cache.get(bitboard.key, max_depth if time_limit is None else self._cache_min_depth)
+            if entry is not None and entry[2] in bitboard.generate_legal_moves():
+                return SearchResult(entry[2], entry[1], entry[0], 0, time.perf_counter() - start, [entry[2]])
+        self._deadline = None
+        self._nodes = 0
+        self._killers = [[0, 0] for _ in range(128)]
+        self._history = [0] * 4096
+        self._table.new_search()
+        history_length = len(bitboard.history)
+        result = None
+        for depth in range(1, max_depth + 1):
+            try:
+                score = self._alpha_beta(bitboard, depth, -INFINITY, INFINITY, 0)
+            except _SearchTimeout:
+                while len(bitboard.history) > history_length:
+                    bitboard.unmake_move()
+                break
+            principal_variation = self._principal_variation(bitboard, depth)
+            result = SearchResult(principal_variation[0] if principal_variation else 0, score, depth, self._nodes,
+                                  time.perf_counter() - start, principal_variation)
+            if self._info_callback is not None:
+                self._info_callback(result)
+            if not principal_variation or abs(score) >= MATE_SCORE - depth:
+                break
+            if time_limit is not None:
+                # Depth 1 always completes; a new iteration that cannot finish in time is not started
+                elapsed = time.perf_counter() - start
+                if elapsed * 2 > time_limit:
+                    break
+                self._deadline = start + time_limit
+        if self._position_cache is not None and result is not None and result.get_best_move():
+            self._position_cache.put(bitboard.key, result.get_depth(), result.get_score(), result.get_best_move())
+        return result
+
+    def _check_time(self):
+        if self._deadline is not None and time.perf_counter() > self._deadline:
+            raise _SearchTimeout()
+
+    def _alpha_beta(self, board, depth, alpha, beta, ply):
+        self._nodes += 1
+        if not self._nodes & 1023:
+            self._check_time()
+        if ply and (board.halfmove_clock >= 100 or board.is_repetition()):
+            return 0
+        in_check = board.is_in_check()
+        if in_check:
+            depth += 1
+        if depth <= 0:
+            return self._quiescence(board, alpha, beta)
+
+        key = board.key
+        table_move = 0
+        entry = self._table.probe(key)
+        if entry is not None:
+            table_move = entry[4]
+            if ply and entry[1] >= depth:
+                score = entry[2]
+                if score > MATE_SCORE - 1000:
+                    score -= ply
+                elif score < 1000 - MATE_SCORE:
+                    score += ply
+                if entry[3] == EXACT or entry[3] == LOWER_BOUND and score >= beta or \
+                   entry[3] == UPPER_BOUND and score <= alpha:
+                    return score
+
+        moves = board.generate_legal_moves()
+        if not moves:
+            return ply - MATE_SCORE if in_check else 0
+        self._order_moves(board, moves, table_move, ply)
+
+        original_alpha = alpha
+        best_score = -INFINITY
+        best_move = 0
+        mailbox = board.mailbox
+        for move in moves:
+            quiet = mailbox[(move >> 6) & 63] < 0 and not move >> 12
+            board.make_move(move)
+            score = -self._alpha_beta(board, depth - 1, -beta, -alpha, ply + 1)
+            board.unmake_move()
+            if score > best_score:
+                best_score = score
+                best_move = move
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        if quiet:
+                            if ply < len(self._killers):
+                                killers = self._killers[ply]
+                                if killers[0] != move:
+                                    killers[1] = killers[0]
+                                    killers[0] = move
+                            self._history[move & 4095] += depth * depth
+                        break
+
+        flag = LOWER_BOUND if best_score >= beta else UPPER_BOUND if best_score <= original_alpha else EXACT
+        stored = best_score
+        if stored > MATE_SCORE - 1000:
+            stored += ply
+        elif stored < 1000 - MATE_SCORE:
+            stored -= ply
+        self._table.store(key, depth, stored, flag, best_move)
+        return best_score
+
+    def _quiescence(self, board, alpha, beta):
+        # Captures and queen promotions only, until the position is quiet
+        self._nodes += 1
+        if not self._nodes & 1023:
+            self._check_time()
+        stand_pat = evaluate(board)
+        if stand_pat >= beta:
+            return stand_pat
+        if stand_pat > alpha:
+            alpha = stand_pat
+        mailbox = board.mailbox
+        moves = [move for move in board.generate_legal_moves()
+                 if mailbox[(move >> 6) & 63] >= 0 or move >> 15 == EN_PASSANT or (move >> 12) & 7 == QUEEN]
+        self._order_moves(board, moves, 0, None)
+        for move in moves:
+            board.make_move(move)
+            score = -self._quiescence(board, -beta, -alpha)
+            board.unmake_move()
+            if score >= beta:
+                return score
+            if score > alpha:
+                alpha = score
+        return alpha
+
+    def _order_moves(self, board, moves, table_move, ply):
+        mailbox = board.mailbox
+        killers = self._killers[ply] if ply is not None and ply < len(self._killers) else (0, 0)
+        history = self._history
+
+        def priority(move):
+            if move == table_move:
+                return 1 << 30
+            victim = mailbox[(move >> 6) & 63]
+            if victim >= 0 or move >> 15 == EN_PASSANT:
+                # Most valuable victim first, then least valuable attacker
+                return (1 << 26) + (victim % 6 if victim >= 0 else PAWN) * 8 - mailbox[move & 63] % 6
+            if move >> 12 & 7:
+                return (1 << 25) + (move >> 12 & 7)
+            if move == killers[0]:
+                return 1 << 24
+            if move == killers[1]:
+                return (1 << 24) - 1
+            return min(history[move & 4095], (1 << 24) - 2)
+
+        moves.sort(key=priority, reverse=True)
+
+    def _principal_variation(self, board, depth):
+        # Follows table moves from the root, checking each is still legal
+        line = []
+        seen = set()
+        while len(line) < depth:
+            entry = self._table.probe(board.key)
+            if entry is None or not entry[4] or board.key in seen or entry[4] not in board.generate_legal_moves():
+                break
+            seen.add(board.key)
+            line.append(entry[4])
+            board.make_move(entry[4])
+        for _ in line:
+            board.unmake_move()
+        return line
+
+
+class EnginePlayer(Player):
+    def __init__(self, color, engine=None, time_limit=1.0, max_depth=64):
+        super().__init__(color)
+        self.engine = engine if engine is not None else SearchEngine()
+        self.time_limit = time_limit
+        self.max_depth = max_depth
+        self.last_result = None
+
+    def choose_move(self, chess_board):
+        self.last_result = self.engine.search(chess_board.bitboard, self.max_depth, self.time_limit)
+        return self.last_result.get_best_move() if self.last_result is not None else None
+
+
+# EPD suites: four FEN fields followed by opcodes, e.g. "bm Nf3; id \"pos 1\";" or perft
+# counts as ";D1 20 ;D2 400"
+class EpdResult:
+    def __init__(self, record_id, fen, passed, failures, best_move, nodes, seconds):
+        self.record_id = record_id
+        self.fen = fen
+        self.passed = passed
+        self.failures = failures        # Failed opcodes, e.g. ['D3 expected 8902 got 8900']
+        self.best_move = best_move      # SAN of the engine's choice, when searched
+        self.nodes = nodes
+        self.seconds = seconds
+
+    def __str__(self):
+        status = 'ok' if self.passed else 'FAIL ' + '; '.join(self.failures)
+        return f"{self.record_id}: {status} ({self.nodes} nodes, {self.seconds * 1000:.0f} ms)"
+
+
+def parse_epd(line):
+    # Returns (fen, opcodes) where opcodes maps an opcode to its operand string
+    fields = line.split(None, 4)
+    fen = ' '.join(fields[:4]) + ' 0 1'
+    opcodes = {}
+    for operation in (fields[4] if len(fields) > 4 else '').split(';'):
+        operation = operation.strip()
+        if operation:
+            opcode, _, operand = operation.partition(' ')
+            opcodes[opcode] = operand.strip().strip('"')
+    if 'hmvc' in opcodes or 'fmvn' in opcodes:
+        fen = ' '.join(fields[:4]) + f" {opcodes.get('hmvc', '0')} {opcodes.get('fmvn', '1')}"
+    return fen, opcodes
+
+
+def iter_epd(path):
+    with open(path) as epd_file:
+        for number, line in enumerate(epd_file, 1):
+            line = line.strip()
+            if line and not line.startswith('#'):
+                yield number, line
+
+
+def _run_epd_chunk(task):
+    # Worker entry point: checks a chunk of EPD lines and returns their results in order
+    lines, perft_depth, search_depth, time_limit = task
+    engine = SearchEngine(table_size=1 << 16) if search_depth or time_limit else None
+    results = []
+    for number, line in lines:
+        fen, opcodes = parse_epd(line)
+        record_id = opcodes.get('id', f"line {number}")
+        failures = []
+        nodes = 0
+        best_move = None
+        start = time.perf_counter()
+        try:
+            bitboard = BitBoard.from_fen(fen)
+            # Round-tripping through the packed position checks the encoding on every record
+            if Position.from_bitboard(bitboard).to_fen() != bitboard.to_fen():
+                failures.append('position encoding')
+            for depth in range(1, perft_depth + 1):
+                if f"D{depth}" in opcodes:
+                    counted = bitboard.perft(depth)
+                    nodes += counted
+                    if counted != int(opcodes[f"D{depth}"]):
+                        failures.append(f"D{depth} expected {opcodes[f'D{depth}']} got {counted}")
+            if engine is not None and bitboard.generate_legal_moves():
+                result = engine.search(bitboard, search_depth or 64, time_limit)
+                nodes += result.get_nodes()
+                best_move = move_to_san(bitboard, result.get_best_move())
+                stripped = best_move.rstrip('+#')
+                if 'bm' in opcodes and stripped not in [san.rstrip('+#') for san in opcodes['bm'].split()]:
+                    failures.append(f"bm expected {opcodes['bm']} got {best_move}")
+                if 'am' in opcodes and stripped in [san.rstrip('+#') for san in opcodes['am'].split()]:
+                    failures.append(f"am avoided {opcodes['am']} got {best_move}")
+        except (ValueError, IndexError) as error:
+            failures.append(f"invalid record: {error}")
+        results.append(EpdResult(record_id, fen, not failures, failures, best_move, nodes, time.perf_counter() - start))
+    return results
+
+
+def run_epd_suite(path, perft_depth=3, search_depth=None, time_limit=None, workers=None, chunk_size=16):
+    # Streams EpdResults in file order while a process pool checks later chunks; only a few chunks
+    # per worker are in flight, so suites of any size run in bounded memory
+    workers = workers or os.cpu_count() or 1
+    lines = iter_epd(path)
+
+    def tasks():
+        while True:
+            chunk = list(itertools.islice(lines, chunk_size))
+            if not chunk:
+                return
+            yield chunk, perft_depth, search_depth, time_limit
+
+    if workers == 1:
+        for task in tasks():
+            yield from _run_epd_chunk(task)
+        return
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for task in tasks():
+            pending.append(executor.submit(_run_epd_chunk, task))
+            if len(pending) >= 2 * workers:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def summarize_epd_results(results):
+    summary = {'records': 0, 'passed': 0, 'failed': 0, 'nodes': 0, 'seconds': 0.0}
+    for result in results:
+        summary['records'] += 1
+        summary['passed' if result.passed else 'failed'] += 1
+        summary['nodes'] += result.nodes
+        summary['seconds'] += result.seconds
+    summary['nodes_per_second'] = summary['nodes'] / summary['seconds'] if summary['seconds'] else 0.0
+    return summary
+
+
+def benchmark_board_cloning(clones=500):
+    # Per-clone allocated blocks, bytes and microseconds, measured with tracemalloc, for a fresh
+    # board, copy.deepcopy and ChessBoard.clone
+    import tracemalloc
+    source = ChessBoard()
+    results = {}
+    for name, make in (('new', ChessBoard), ('deepcopy', lambda: copy.deepcopy(source)), ('clone', source.clone)):
+        boards = []
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        for _ in range(clones):
+            boards.append(make())
+        after = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        differences = after.compare_to(before, 'filename')
+        start = time.perf_counter()
+        for _ in range(clones):
+            make()
+        results[name] = {
+            'blocks': sum(difference.count_diff for difference in differences) / clones,
+            'bytes': sum(difference.size_diff for difference in differences) / clones,
+            'microseconds': (time.perf_counter() - start) / clones * 1e6,
+        }
+    return results
+
+
+# Headless engine-vs-engine matches
+class MovePolicy(ABC):
+    @abstractmethod
+    def choose_move(self, bitboard, rng):
+        pass
+
+    @abstractmethod
+    def get_name(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class RandomPolicy(MovePolicy):
+    def choose_move(self, bitboard, rng):
+        return rng.choice(bitboard.generate_legal_moves())
+
+    def get_name(self):
+        return 'random'
+
+
+class EnginePolicy(MovePolicy):
+    def __init__(self, depth=3, time_limit=None, table_size=1 << 16, name=None, book_path=None, cache_path=None):
+        self._depth = depth
+        self._time_limit = time_limit
+        self._table_size = table_size
+        self._name = name or f"engine-d{depth}"
+        self._book_path = book_path
+        self._cache_path = cache_path
+        self._engine = None
+
+    def choose_move(self, bitboard, rng):
+        # The engine, book and cache are opened on first use, so policies travel to worker processes
+        # without their table or file handles
+        if self._engine is None:
+            book = OpeningBook(self._book_path) if self._book_path else None
+            position_cache = PositionCache(self._cache_path) if self._cache_path else None
+            self._engine = SearchEngine(self._table_size, book=book, position_cache=position_cache)
+        return self._engine.search(bitboard, self._depth, self._time_limit).get_best_move()
+
+    def get_name(self):
+        return self._name
+
+    def close(self):
+        if self._engine is not None:
+            self._engine.close()
+            self._engine = None
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state['_engine'] = None
+        return state
+
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return sorted_values[index]
+
+
+def play_match_game(white, black, rng, opening_plies=0, max_plies=300):
+    # Plays one game from the start position; the first opening_plies moves are random so repeated
+    # pairings do not replay the same game. Returns (result, termination, san moves, latencies by color)
+    bitboard = BitBoard.from_fen(START_FEN)
+    policies = (white, black)
+    san_moves = []
+    latencies = ([], [])
+    while True:
+        moves = bitboard.generate_legal_moves()
+        if not moves:
+            if bitboard.is_in_check():
+                return ('0-1' if bitboard.side == WHITE else '1-0'), 'checkmate', san_moves, latencies
+            return '1/2-1/2', 'stalemate', san_moves, latencies
+        if bitboard.halfmove_clock >= 100:
+            return '1/2-1/2', 'fifty-move rule', san_moves, latencies
+        if bitboard.count_repetitions() >= 2:
+            return '1/2-1/2', 'threefold repetition', san_moves, latencies
+        if bitboard.is_insufficient_material():
+            return '1/2-1/2', 'insufficient material', san_moves, latencies
+        if len(san_moves) >= max_plies:
+            return '1/2-1/2', 'move limit', san_moves, latencies
+        if len(san_moves) < opening_plies:
+            move = rng.choice(moves)
+        else:
+            start = time.perf_counter()
+            move = policies[bitboard.side].choose_move(bitboard, rng)
+            latencies[bitboard.side].append(time.perf_counter() - start)
+        san_moves.append(move_to_san(bitboard, move, moves))
+        bitboard.make_move(move)
+
+
+def game_to_pgn(headers, san_moves, result):
+    lines = [f'[{name} "{value}"]' for name, value in headers.items()]
+    tokens = []
+    for ply, san in enumerate(san_moves):
+        tokens.append(f"{ply // 2 + 1}. {san}" if ply % 2 == 0 else san)
+    tokens.append(result)
+    text = ''
+    movetext = []
+    for token in tokens:
+        if len(text) + len(token) + 1 > 79:
+            movetext.append(text)
+            text = token
+        else:
+            text = f"{text} {token}" if text else token
+    movetext.append(text)
+    return '\n'.join(lines) + '\n\n' + '\n'.join(movetext) + '\n\n'
+
+
+def _play_match_chunk(task):
+    policies, seed, games, opening_plies, max_plies, record, date = task
+    try:
+        return _play_match_games(policies, seed, games, opening_plies, max_plies, record, date)
+    finally:
+        # Position caches write in batches; whatever is pending reaches disk before the results return
+        for policy in policies.values():
+            policy.close()
+
+
+def _play_match_games(policies, seed, games, opening_plies, max_plies, record, date):
+    stats = {}
+    lengths = []
+    pgns = [] if record else None
+    for pairing, game_index in games:
+        white, black = pairing if game_index % 2 == 0 else (pairing[1], pairing[0])
+        # Seeding per (pairing, game) keeps results independent of how games are split across workers
+        rng = random.Random(f'{seed}:{pairing[0]}:{pairing[1]}:{game_index}')
+        result, termination, san_moves, latencies = play_match_game(policies[white], policies[black], rng,
+                                                                    opening_plies, max_plies)
+        lengths.append(len(san_moves))
+        if record:
+            headers = {'Event': 'Engine match', 'Site': '?', 'Date': date, 'Round': str(game_index + 1),
+                       'White': white, 'Black': black, 'Result': result, 'Termination': termination}
+            pgns.append(game_to_pgn(headers, san_moves, result))
+        for color, (name, opponent) in enumerate(((white, black), (black, white))):
+            entry = stats.setdefault(name, {'wins': 0, 'losses': 0, 'draws': 0, 'latencies': [], 'scores': {}})
+            points = 0.5 if result == '1/2-1/2' else 1.0 if (result == '1-0') == (color == WHITE) else 0.0
+            entry['wins' if points == 1.0 else 'draws' if points == 0.5 else 'losses'] += 1
+            entry['latencies'].extend(latencies[color])
+            score = entry['scores'].setdefault(opponent, [0.0, 0])
+            score[0] += points
+            score[1] += 1
+    return stats, lengths, pgns
+
+
+def elo_difference(score, games):
+    # Rating difference implied by a score fraction, with an approximate 95% margin
+    if not games:
+        return 0.0, 0.0
+    fraction = min(max(score / games, 0.5 / games), 1 - 0.5 / games)
+
+    def to_elo(value):
+        return -400 * math.log10(1 / value - 1)
+
+    margin = 1.96 * math.sqrt(fraction * (1 - fraction) / games)
+    low, high = max(fraction - margin, 1e-6), min(fraction + margin, 1 - 1e-6)
+    return to_elo(fraction) + 0.0, (to_elo(high) - to_elo(low)) / 2
+
+
+class MatchResult:
+    def __init__(self):
+        self._stats = {}
+        self._lengths = []
+        self._elapsed = 0.0
+
+    def merge(self, stats, lengths):
+        for name, entry in stats.items():
+            total = self._stats.setdefault(name, {'wins': 0, 'losses': 0, 'draws': 0, 'latencies': [], 'scores': {}})
+            total['wins'] += entry['wins']
+            total['losses'] += entry['losses']
+            total['draws'] += entry['draws']
+            total['latencies'].extend(entry['latencies'])
+            for opponent, (points, games) in entry['scores'].items():
+                score = total['scores'].setdefault(opponent, [0.0, 0])
+                score[0] += points
+                score[1] += games
+        self._lengths.extend(lengths)
+
+    def set_elapsed(self, elapsed):
+        self._elapsed = elapsed
+
+    def get_game_count(self):
+        return len(self._lengths)
+
+    def get_games_per_hour(self):
+        return self.get_game_count() * 3600 / self._elapsed if self._elapsed else 0.0
+
+    def get_elo(self, name, opponent):
+        # Elo difference of name over opponent and its 95% margin, from their games against each other
+        points, games = self._stats[name]['scores'].get(opponent, (0.0, 0))
+        return elo_difference(points, games)
+
+    def get_summary(self):
+        lengths = sorted(self._lengths)
+        summary = {
+            'games': len(lengths),
+            'elapsed': self._elapsed,
+            'games_per_hour': self.get_games_per_hour(),
+            'mean_plies': sum(lengths) / len(lengths) if lengths else 0.0,
+            'players': {},
+        }
+        for name, entry in self._stats.items():
+            latencies = sorted(entry['latencies'])
+            played = entry['wins'] + entry['losses'] + entry['draws']
+            summary['players'][name] = {
+                'wins': entry['wins'],
+                'losses': entry['losses'],
+                'draws': entry['draws'],
+                'score': (entry['wins'] + entry['draws'] / 2) / played if played else 0.0,
+                'elo': {opponent: self.get_elo(name, opponent) for opponent in entry['scores']},
+                'mean_move_latency': sum(latencies) / len(latencies) if latencies else 0.0,
+                'p50_move_latency': _percentile(latencies, 0.50),
+                'p95_move_latency': _percentile(latencies, 0.95),
+                'max_move_latency': latencies[-1] if latencies else 0.0,
+            }
+        return summary
+
+    def print(self):
+        summary = self.get_summary()
+        print(f"{summary['games']} games in {summary['elapsed']:.1f}s ({summary['games_per_hour']:.0f} games/hour), "
+              f"mean length {summary['mean_plies']:.0f} plies")
+        for name, player in summary['players'].items():
+            print(f"{name}: {player['wins']}W {player['losses']}L {player['draws']}D ({player['score']:.1%}), "
+                  f"move latency p50 {player['p50_move_latency'] * 1000:.1f}ms p95 {player['p95_move_latency'] * 1000:.1f}ms "
+                  f"max {player['max_move_latency'] * 1000:.1f}ms")
+            for opponent, (elo, margin) in player['elo'].items():
+                print(f"  vs {opponent}: {elo:+.0f} +/- {margin:.0f} Elo")
+
+
+class MatchRunner:
+    def __init__(self, policies, seed=0, opening_plies=4, max_plies=300):
+        self._policies = {}
+        for policy in policies:
+            if policy.get_name() in self._policies:
+                raise ValueError(f'Duplicate policy {policy.get_name()}')
+            self._policies[policy.get_name()] = policy
+        if len(self._policies) < 2:
+            raise ValueError('A match needs at least two policies')
+        self._seed = seed
+        self._opening_plies = opening_plies
+        self._max_plies = max_plies
+
+    def get_pairings(self):
+        names = list(self._policies)
+        return [(names[i], names[j]) for i in range(len(names)) for j in range(i + 1, len(names))]
+
+    def _make_tasks(self, games_per_pairing, chunk_size, record):
+        games = [(pairing, index) for pairing in self.get_pairings() for index in range(games_per_pairing)]
+        date = time.strftime('%Y.%m.%d')
+        for start in range(0, len(games), chunk_size):
+            yield (self._policies, self._seed, games[start:start + chunk_size], self._opening_plies,
+                   self._max_plies, record, date)
+
+    def run(self, games_per_pairing, workers=None, chunk_size=4, pgn_path=None):
+        # Each pairing plays games_per_pairing games, swapping colors every game
+        result = MatchResult()
+        start = time.perf_counter()
+        tasks = self._make_tasks(games_per_pairing, chunk_size, pgn_path is not None)
+        pgn_file = open(pgn_path, 'w') if pgn_path else None
+        executor = None
+        if workers != 1:
+            from concurrent.futures import ProcessPoolExecutor
+            executor = ProcessPoolExecutor(max_workers=workers)
+        try:
+            outputs = executor.map(_play_match_chunk, tasks) if executor else map(_play_match_chunk, tasks)
+            for stats, lengths, pgns in outputs:
+                result.merge(stats, lengths)
+                if pgn_file:
+                    pgn_file.writelines(pgns)
+        finally:
+            if executor:
+                executor.shutdown()
+            if pgn_file:
+                pgn_file.close()
+        result.set_elapsed(time.perf_counter() - start)
+        return result
+
+
+# Opening book: a header, then fixed-size entries sorted by position key, each holding the key, a
+# move and how often it was played. Lookups binary-search the memory-mapped file, so opening a book
+# costs nothing and worker processes share the pages
+BOOK_MAGIC = b'CHOB'
+BOOK_VERSION = 1
+_BOOK_HEADER = struct.Struct('<4sBI')
+_BOOK_ENTRY = struct.Struct('<QII')
+
+
+def _strip_pgn_comments(line, in_comment):
+    # Removes {...} and ; comments from one line of movetext; braces may span lines and a ; comment
+    # runs to the end of its line. Returns the remaining text and whether a brace is still open.
+    kept = []
+    while line:
+        if in_comment:
+            close = line.find('}')
+            if close < 0:
+                break
+            line = line[close + 1:]
+            in_comment = False
+        opening = min((index for index in (line.find('{'), line.find(';')) if index >= 0), default=-1)
+        if opening < 0:
+            kept.append(line)
+            break
+        kept.append(line[:opening])
+        if line[opening] == ';':
+            break
+        line = line[opening + 1:]
+        in_comment = True
+    return ' '.join(kept), in_comment
+
+
+def _parse_movetext(movetext):
+    text = re.sub(r'\$\d+', ' ', ' '.join(movetext))
+    while '(' in text:
+        text = re.sub(r'\([^()]*\)', ' ', text)
+    tokens = re.sub(r'\d+\.(\.\.)?', ' ', text).split()
+    result = tokens.pop() if tokens and tokens[-1] in ('1-0', '0-1', '1/2-1/2', '*') else '*'
+    return tokens, result
+
+
+def iter_pgn_games(path):
+    # Yields (headers, san moves, result) for each game, skipping comments, variations and NAGs
+    headers = {}
+    movetext = []
+    in_comment = False
+    with open(path, encoding='utf-8', errors='replace') as pgn_file:
+        for line in pgn_file:
+            line = line.strip()
+            if not in_comment and line.startswith('[') and line.endswith(']'):
+                if movetext:
+                    yield (headers, *_parse_movetext(movetext))
+                    headers = {}
+                    movetext = []
+                name, _, value = line[1:-1].partition(' ')
+                headers[name] = value.strip('"')
+            elif line:
+                text, in_comment = _strip_pgn_comments(line, in_comment)
+                movetext.append(text)
+    if movetext:
+        yield (headers, *_parse_movetext(movetext))
+
+
+def build_opening_book(pgn_paths, book_path, max_plies=20, min_count=1):
+    # Counts every (position, move) in the first max_plies of each game and writes the sorted book;
+    # returns the number of entries written
+    counts = {}
+    for pgn_path in pgn_paths:
+        for headers, san_moves, _ in iter_pgn_games(pgn_path):
+            bitboard = BitBoard.from_fen(headers.get('FEN', START_FEN))
+            for san in san_moves[:max_plies]:
+                move = parse_san(bitboard, san)
+                if move is None:
+                    break
+                entry = (bitboard.key, move)
+                counts[entry] = counts.get(entry, 0) + 1
+                bitboard.make_move(move)
+    entries = sorted(((key, move, count) for (key, move), count in counts.items() if count >= min_count),
+                     key=lambda entry: (entry[0], -entry[2], entry[1]))
+    with open(book_path, 'wb') as book_file:
+        book_file.write(_BOOK_HEADER.pack(BOOK_MAGIC, BOOK_VERSION, len(entries)))
+        for entry in entries:
+            book_file.write(_BOOK_ENTRY.pack(*entry))
+    return len(entries)
+
+
+class OpeningBook:
+    def __init__(self, path):
+        self._file = open(path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self._count = _BOOK_HEADER.unpack_from(self._map, 0)
+        if magic != BOOK_MAGIC or version != BOOK_VERSION:
+            raise ValueError(f'{path} is not an opening book')
+
+    def get_entry_count(self):
+        return self._count
+
+    def get_moves(self, bitboard):
+        # (move, count) pairs for the position, most played first. Entries match on the full 64-bit key,
+        # so legality is only checked for the move that gets played
+        key = bitboard.key
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            if _BOOK_ENTRY.unpack_from(self._map, _BOOK_HEADER.size + middle * _BOOK_ENTRY.size)[0] < key:
+                low = middle + 1
+            else:
+                high = middle
+        moves = []
+        while low < self._count:
+            entry_key, move, count = _BOOK_ENTRY.unpack_from(self._map, _BOOK_HEADER.size + low * _BOOK_ENTRY.size)
+            if entry_key != key:
+                break
+            moves.append((move, count))
+            low += 1
+        return moves
+
+    def choose_move(self, bitboard, rng=None):
+        # Most played move, or a random pick weighted by play count when rng is given; None out of book
+        moves = self.get_moves(bitboard)
+        if not moves:
+            return None
+        if rng is None:
+            move = moves[0][0]
+        else:
+            move = rng.choices([move for move, _ in moves], weights=[count for _, count in moves])[0]
+        return move if move in bitboard.generate_legal_moves() else None
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+
+class PositionCache:
+    # Search results keyed by Zobrist key in a SQLite file, fronted by an in-memory LRU. Hits only
+    # touch memory; usage times and new results reach disk in batches, and the least recently used
+    # rows are deleted once the file holds more than max_entries
+    def __init__(self, path, max_entries=1000000, memory_entries=10000, flush_interval=256):
+        import sqlite3
+        self._connection = sqlite3.connect(path, timeout=30)
+        self._connection.execute('CREATE TABLE IF NOT EXISTS positions (key INTEGER PRIMARY KEY, depth INTEGER, '
+                                 'score INTEGER, move INTEGER, used REAL)')
+        self._connection.execute('CREATE INDEX IF NOT EXISTS positions_used ON positions (used)')
+        self._max_entries = max_entries
+        self._memory_entries = memory_entries
+        self._flush_interval = flush_interval
+        self._memory = OrderedDict()    # Map<key, (depth, score, move)>
+        self._pending = {}              # Map<key, (depth, score, move, used)> not yet written
+        self._touched = {}              # Map<key, used> for disk rows read since the last flush
+        self._hits = self._misses = 0
+
+    @staticmethod
+    def _to_row_key(key):
+        # SQLite integers are signed 64-bit
+        return key - (1 << 63)
+
+    def get(self, key, min_depth=0):
+        # (depth, score, move) searched at least min_depth deep, or None
+        entry = self._memory.get(key)
+        if entry is None:
+            row = self._connection.execute('SELECT depth, score, move FROM positions WHERE key = ?',
+                                           (self._to_row_key(key),)).fetchone()
+            if row is not None:
+                entry = row
+                self._remember(key, entry)
+        else:
+            self._memory.move_to_end(key)
+        if entry is None or entry[0] < min_depth:
+            self._misses += 1
+            return None
+        self._hits += 1
+        if key not in self._pending:
+            self._touched[key] = time.time()
+            if len(self._pending) + len(self._touched) >= self._flush_interval:
+                self.flush()
+        return entry
+
+    def put(self, key, depth, score, move):
+        existing = self._memory.get(key)
+        if existing is not None and existing[0] > depth:
+            return
+        self._remember(key, (depth, score, move))
+        self._pending[key] = (depth, score, move, time.time())
+        if len(self._pending) + len(self._touched) >= self._flush_interval:
+            self.flush()
+
+    def _remember(self, key, entry):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        if len(self._memory) > self._memory_entries:
+            self._memory.popitem(last=False)
+
+    def flush(self):
+        with self._connection:
+            # Another process may have stored a deeper result for the same position meanwhile
+            self._connection.executemany('INSERT INTO positions VALUES (?, ?, ?, ?, ?) ON CONFLICT (key) DO UPDATE SET '
+                                         'depth = excluded.depth, score = excluded.score, move = excluded.move, '
+                                         'used = excluded.used WHERE excluded.depth >= positions.depth',
+                                         [(self._to_row_key(key),) + entry for key, entry in self._pending.items()])
+            self._connection.executemany('UPDATE positions SET used = ? WHERE key = ?',
+                                         [(used, self._to_row_key(key)) for key, used in self._touched.items()])
+            count = self._connection.execute('SELECT COUNT(*) FROM positions').fetchone()[0]
+            if count > self._max_entries:
+                self._connection.execute('DELETE FROM positions WHERE key IN (SELECT key FROM positions ORDER BY used LIMIT ?)',
+                                         (count - self._max_entries,))
+        self._pending.clear()
+        self._touched.clear()
+
+    def get_metrics(self):
+        lookups = self._hits + self._misses
+        return {'hits': self._hits, 'misses': self._misses, 'hit_rate': self._hits / lookups if lookups else 0.0,
+                'memory_entries': len(self._memory)}
+
+    def close(self):
+        self.flush()
+        self._connection.close()
+
+
+def benchmark_book_lookups(book_path, positions=10000, seed=0):
+    # Mean microseconds per book probe over positions reached by random book lines
+    book = OpeningBook(book_path)
+    rng = random.Random(seed)
+    bitboards = []
+    while len(bitboards) < positions:
+        bitboard = BitBoard.from_fen(START_FEN)
+        for _ in range(rng.randrange(12)):
+            move = book.choose_move(bitboard, rng)
+            if move is None:
+                break
+            bitboard.make_move(move)
+        bitboards.append(bitboard)
+    start = time.perf_counter()
+    found = sum(1 for bitboard in bitboards if book.get_moves(bitboard))
+    seconds = time.perf_counter() - start
+    book.close()
+    return {'positions': positions, 'in_book': found, 'microseconds_per_lookup': seconds / positions * 1e6}
+
+
+def main():
+    game = ChessGame()
+    game.start_game()
+
+
+if __name__ == '__main__':
+    main()
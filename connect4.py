@@ -1,4 +1,10 @@
 import enum
+import os
+import random
+import struct
+import time
+from abc import ABC, abstractmethod
+from collections import Counter
 
 class GridPosition(enum.Enum):
     EMPTY = 0,
@@ -6,24 +12,165 @@ class GridPosition(enum.Enum):
     RED = 2
 
 
+# Line directions as (row step, column step): horizontal, vertical, diagonal, anti-diagonal
+DIRECTIONS = ((0, 1), (1, 0), (1, 1), (1, -1))
+
+
+class ThreatTracker:
+    # Keeps the length of every same-colour run in each direction, stored only at the run's two
+    # end cells. Placing a piece joins at most two runs per direction, so bookkeeping, win checks
+    # and threat updates touch O(1) cells per move regardless of the board size.
+    def __init__(self, grid, connectN):
+        self._grid = grid
+        self._connectN = connectN
+        self.reset()
+
+    def reset(self):
+        self._runs = [{} for _ in DIRECTIONS]     # Map<cell, run length> per direction, valid at run ends
+        self._threats = {GridPosition.YELLOW: set(), GridPosition.RED: set()}
+        self._history = []                        # Undo records, one per placed piece
+        self._lastRunLength = 0
+
+    def getConnectN(self):
+        return self._connectN
+
+    def getLastRunLength(self):
+        return self._lastRunLength
+
+    def getLastMove(self):
+        return self._history[-1][0] if self._history else None
+
+    def _pieceAt(self, row, col):
+        if 0 <= row < self._grid.getRowCount() and 0 <= col < self._grid.getColumnCount():
+            return self._grid.getGrid()[row][col]
+        return None
+
+    def _runLength(self, direction, row, col, piece):
+        # Length of the run of piece ending at (row, col), which must border an empty cell
+        if self._pieceAt(row, col) != piece:
+            return 0
+        return self._runs[direction][row * self._grid.getColumnCount() + col]
+
+    def _completesLine(self, row, col, piece):
+        for d, (dr, dc) in enumerate(DIRECTIONS):
+            length = 1 + self._runLength(d, row - dr, col - dc, piece) + self._runLength(d, row + dr, col + dc, piece)
+            if length >= self._connectN:
+                return True
+        return False
+
+    def _setRun(self, undo, direction, cell, length):
+        runs = self._runs[direction]
+        undo.append((runs, cell, runs.get(cell)))
+        runs[cell] = length
+
+    def _setThreat(self, undo, piece, cell, isThreat):
+        threats = self._threats[piece]
+        if (cell in threats) != isThreat:
+            undo.append((threats, cell, not isThreat))
+            if isThreat:
+                threats.add(cell)
+            else:
+                threats.discard(cell)
+
+    def place(self, row, col, piece):
+        columns = self._grid.getColumnCount()
+        cell = row * columns + col
+        undo = []
+        longest = 0
+        for player in self._threats:
+            self._setThreat(undo, player, cell, False)
+        for d, (dr, dc) in enumerate(DIRECTIONS):
+            before = self._runLength(d, row - dr, col - dc, piece)
+            after = self._runLength(d, row + dr, col + dc, piece)
+            length = before + after + 1
+            longest = max(longest, length)
+            self._setRun(undo, d, (row - before * dr) * columns + (col - before * dc), length)
+            self._setRun(undo, d, (row + after * dr) * columns + (col + after * dc), length)
+            # Only the empty cells just past either end of the grown run can have become threats
+            for r, c in ((row - (before + 1) * dr, col - (before + 1) * dc), (row + (after + 1) * dr, col + (after + 1) * dc)):
+                if self._pieceAt(r, c) == GridPosition.EMPTY:
+                    self._setThreat(undo, piece, r * columns + c, self._completesLine(r, c, piece))
+        self._history.append(((row, col), self._lastRunLength, undo))
+        self._lastRunLength = longest
+        return longest
+
+    def undo(self):
+        _, self._lastRunLength, undo = self._history.pop()
+        for container, key, previous in reversed(undo):
+            if isinstance(container, set):
+                if previous:
+                    container.add(key)
+                else:
+                    container.discard(key)
+            elif previous is None:
+                del container[key]
+            else:
+                container[key] = previous
+
+    def getThreats(self, piece):
+        columns = self._grid.getColumnCount()
+        return {divmod(cell, columns) for cell in self._threats[piece]}
+
+    def getThreatCount(self, piece):
+        return len(self._threats[piece])
+
+    def getPlayableThreats(self, piece):
+        # Columns where piece wins immediately
+        columns = self._grid.getColumnCount()
+        playable = set()
+        for cell in self._threats[piece]:
+            row, col = divmod(cell, columns)
+            if self._grid.getNextRow(col) == row:
+                playable.add(col)
+        return sorted(playable)
+
+
 class Grid:
     def __init__(self, rows, columns):
         self._rows = rows
         self._columns = columns
         self._grid = None
+        self._heights = None
+        self._pieceCount = 0
+        self._tracker = None
         self.initGrid()
     
     def initGrid(self):
         self._grid= ([[GridPosition.EMPTY for _ in range(self._columns)] for _ in range(self._rows)])
+        self._heights = [0] * self._columns
+        self._pieceCount = 0
+        if self._tracker:
+            self._tracker.reset()
+
+    def enableThreatTracking(self, connectN):
+        if self._pieceCount:
+            raise ValueError('Threat tracking must be enabled on an empty grid')
+        self._tracker = ThreatTracker(self, connectN)
+        return self._tracker
+
+    def getThreatTracker(self):
+        return self._tracker
 
     def getGrid(self):
         return self._grid
     
-    def getColumnCount(self):
-        return self._columns
+    def getRowCount(self):
+        return self._rows
     
     def getColumnCount(self):
         return self._columns
+
+    def getNextRow(self, column):
+        return self._rows - 1 - self._heights[column]
+
+    def isColumnFull(self, column):
+        return self._heights[column] == self._rows
+
+    def isFull(self):
+        return self._pieceCount == self._rows * self._columns
+
+    def getValidColumns(self):
+        return [c for c in range(self._columns) if self._heights[c] < self._rows]
     
     def placePiece(self, column, piece):
         if column < 0 or column >= self._columns:
@@ -31,52 +178,43 @@ class Grid:
         
         if piece == GridPosition.EMPTY:
             raise ValueError('Invalid piece')
-        for row in range(self._rows-1, -1,-1):
-            self._grid[row][column] = piece
-            return row
+        if self._heights[column] == self._rows:
+            raise ValueError('Column is full')
+        row = self._rows - 1 - self._heights[column]
+        self._grid[row][column] = piece
+        self._heights[column] += 1
+        self._pieceCount += 1
+        if self._tracker:
+            self._tracker.place(row, column, piece)
+        return row
+
+    def removePiece(self, column):
+        if self._heights[column] == 0:
+            raise ValueError('Column is empty')
+        row = self._rows - self._heights[column]
+        if self._tracker:
+            if self._tracker.getLastMove() != (row, column):
+                raise ValueError('Only the last placed piece can be removed while tracking threats')
+            self._tracker.undo()
+        self._heights[column] -= 1
+        self._pieceCount -= 1
+        self._grid[row][column] = GridPosition.EMPTY
+        return row
         
     def checkWin(self, connectN, row, col, piece):
-        count = 0
-        #Check  horizontal
-        for c in range(self._columns):
-            if self._grid[row][c] == piece:
-                count += 1
-            else:
-                count = 0
-            if count == connectN:
-                return True
-        # Check vertical
-        count = 0
-        for r in range(self._rows):
-            if self._grid[r][col] == piece:
-                count += 1
-            else:
-                count = 0
-            if count == connectN:
-                return True
-
-        # Check diagonal
-        count = 0
-        for r in range(self._rows):
-            c = row + col - r
-            if c >= 0 and c < self._columns and self._grid[r][c] == piece:
-                count += 1
-            else:
-                count = 0
-            if count == connectN:
+        tracker = self._tracker
+        if tracker and tracker.getConnectN() == connectN and tracker.getLastMove() == (row, col):
+            return tracker.getLastRunLength() >= connectN
+        # Only the connectN - 1 cells on either side of (row, col) can belong to a winning line
+        for dr, dc in DIRECTIONS:
+            count = 1
+            for step in (1, -1):
+                r, c = row + step * dr, col + step * dc
+                while count < connectN and 0 <= r < self._rows and 0 <= c < self._columns and self._grid[r][c] == piece:
+                    count += 1
+                    r, c = r + step * dr, c + step * dc
+            if count >= connectN:
                 return True
-
-        # Check anti-diagonal
-        count = 0
-        for r in range(self._rows):
-            c = col - row + r
-            if c >= 0 and c < self._columns and self._grid[r][c] == piece:
-                count += 1
-            else:
-                count = 0
-            if count == connectN:
-                return True
-
         return False
     
 class Player:
@@ -150,6 +288,441 @@ class Game:
         print(f"{winner.getName()} won the game")
 
 
-grid = Grid(6,7)
-game = Game(grid, 4, 2)
-game.play()
+class MoveStrategy(ABC):
+    def getName(self):
+        return type(self).__name__
+
+    @abstractmethod
+    def chooseColumn(self, grid, piece, connectN, rng):
+        pass
+
+
+class RandomStrategy(MoveStrategy):
+    def chooseColumn(self, grid, piece, connectN, rng):
+        return rng.choice(grid.getValidColumns())
+
+
+class HeuristicStrategy(MoveStrategy):
+    # Win if possible, otherwise block, otherwise play as close to the center as possible
+    def chooseColumn(self, grid, piece, connectN, rng):
+        columns = grid.getValidColumns()
+        opponent = _opponentOf(piece)
+        tracker = grid.getThreatTracker()
+        if tracker and tracker.getConnectN() == connectN:
+            for target in (piece, opponent):
+                winning = tracker.getPlayableThreats(target)
+                if winning:
+                    return winning[0]
+            return self._centerColumn(grid, columns, rng)
+        for target in (piece, opponent):
+            for column in columns:
+                row = grid.placePiece(column, target)
+                won = grid.checkWin(connectN, row, column, target)
+                grid.removePiece(column)
+                if won:
+                    return column
+        return self._centerColumn(grid, columns, rng)
+
+    def _centerColumn(self, grid, columns, rng):
+        center = (grid.getColumnCount() - 1) / 2
+        best = min(abs(column - center) for column in columns)
+        return rng.choice([column for column in columns if abs(column - center) == best])
+
+
+class SearchStrategy(MoveStrategy):
+    def __init__(self, depth=4):
+        self._depth = depth
+
+    def getName(self):
+        return f'SearchStrategy(depth={self._depth})'
+
+    def chooseColumn(self, grid, piece, connectN, rng):
+        columns = grid.getValidColumns()
+        rng.shuffle(columns)
+        columns.sort(key=lambda column: abs(column - (grid.getColumnCount() - 1) / 2))
+        bestColumn = columns[0]
+        bestScore = -float('inf')
+        alpha, beta = -float('inf'), float('inf')
+        for column in columns:
+            row = grid.placePiece(column, piece)
+            if grid.checkWin(connectN, row, column, piece):
+                score = self._winScore(self._depth)
+            else:
+                score = -self._negamax(grid, _opponentOf(piece), connectN, self._depth - 1, -beta, -alpha)
+            grid.removePiece(column)
+            if score > bestScore:
+                bestScore, bestColumn = score, column
+            alpha = max(alpha, score)
+        return bestColumn
+
+    def _winScore(self, depth):
+        # Prefer faster wins and slower losses
+        return 1000000 + depth
+
+    def _negamax(self, grid, piece, connectN, depth, alpha, beta):
+        columns = grid.getValidColumns()
+        if not columns:
+            return 0
+        if depth == 0:
+            return self._evaluate(grid, piece)
+        columns.sort(key=lambda column: abs(column - (grid.getColumnCount() - 1) / 2))
+        best = -float('inf')
+        for column in columns:
+            row = grid.placePiece(column, piece)
+            if grid.checkWin(connectN, row, column, piece):
+                score = self._winScore(depth)
+            else:
+                score = -self._negamax(grid, _opponentOf(piece), connectN, depth - 1, -beta, -alpha)
+            grid.removePiece(column)
+            best = max(best, score)
+            alpha = max(alpha, score)
+            if alpha >= beta:
+                break
+        return best
+
+    def _evaluate(self, grid, piece):
+        tracker = grid.getThreatTracker()
+        if tracker:
+            # Open threats are the cells where a single piece completes a line
+            return 10 * (tracker.getThreatCount(piece) - tracker.getThreatCount(_opponentOf(piece)))
+        # Center control: pieces closer to the middle column take part in more lines
+        center = (grid.getColumnCount() - 1) / 2
+        score = 0
+        for cells in grid.getGrid():
+            for c, cell in enumerate(cells):
+                if cell == GridPosition.EMPTY:
+                    continue
+                weight = center + 1 - abs(c - center)
+                score += weight if cell == piece else -weight
+        return score
+
+
+def _opponentOf(piece):
+    return GridPosition.RED if piece == GridPosition.YELLOW else GridPosition.YELLOW
+
+
+def _percentile(sortedValues, fraction):
+    if not sortedValues:
+        return 0.0
+    index = min(len(sortedValues) - 1, int(fraction * len(sortedValues)))
+    return sortedValues[index]
+
+
+class HeadlessGame:
+    def __init__(self, grid, connectN, strategies):
+        self._grid = grid
+        self._connectN = connectN
+        self._strategies = strategies
+        if not grid.getThreatTracker():
+            grid.enableThreatTracking(connectN)
+        self._pieces = [GridPosition.YELLOW, GridPosition.RED]
+
+    def playRound(self, rng):
+        # Returns (winner seat or None for a draw, moves played, per-seat move latencies)
+        self._grid.initGrid()
+        moves = bytearray()
+        latencies = ([], [])
+        while True:
+            for seat in range(2):
+                if self._grid.isFull():
+                    return None, bytes(moves), latencies
+                piece = self._pieces[seat]
+                start = time.perf_counter()
+                column = self._strategies[seat].chooseColumn(self._grid, piece, self._connectN, rng)
+                latencies[seat].append(time.perf_counter() - start)
+                row = self._grid.placePiece(column, piece)
+                moves.append(column)
+                if self._grid.checkWin(self._connectN, row, column, piece):
+                    return seat, bytes(moves), latencies
+
+
+def _playTournamentChunk(task):
+    strategies, rows, columns, connectN, seed, rounds, record = task
+    stats = {}
+    lengths = []
+    games = [] if record else None
+    for pairing, roundIndex in rounds:
+        first, second = pairing if roundIndex % 2 == 0 else (pairing[1], pairing[0])
+        game = HeadlessGame(Grid(rows, columns), connectN, [strategies[first], strategies[second]])
+        # Seeding per (pairing, round) keeps results independent of how rounds are split across workers
+        rng = random.Random(f'{seed}:{pairing[0]}:{pairing[1]}:{roundIndex}')
+        winner, moves, latencies = game.playRound(rng)
+        lengths.append(len(moves))
+        if record:
+            games.append(moves)
+        for seat, name in enumerate((first, second)):
+            entry = stats.setdefault(name, {'wins': 0, 'losses': 0, 'draws': 0, 'latencies': []})
+            if winner is None:
+                entry['draws'] += 1
+            elif winner == seat:
+                entry['wins'] += 1
+            else:
+                entry['losses'] += 1
+            entry['latencies'].extend(latencies[seat])
+    return stats, lengths, games
+
+
+class TournamentResult:
+    def __init__(self):
+        self._stats = {}
+        self._lengths = []
+        self._elapsed = 0.0
+
+    def merge(self, stats, lengths):
+        for name, entry in stats.items():
+            total = self._stats.setdefault(name, {'wins': 0, 'losses': 0, 'draws': 0, 'latencies': []})
+            total['wins'] += entry['wins']
+            total['losses'] += entry['losses']
+            total['draws'] += entry['draws']
+            total['latencies'].extend(entry['latencies'])
+        self._lengths.extend(lengths)
+
+    def setElapsed(self, elapsed):
+        self._elapsed = elapsed
+
+    def getRoundCount(self):
+        return len(self._lengths)
+
+    def getRoundsPerSecond(self):
+        return self.getRoundCount() / self._elapsed if self._elapsed else 0.0
+
+    def getWinRate(self, name):
+        entry = self._stats[name]
+        played = entry['wins'] + entry['losses'] + entry['draws']
+        return entry['wins'] / played if played else 0.0
+
+    def getSummary(self):
+        lengths = sorted(self._lengths)
+        summary = {
+            'rounds': len(lengths),
+            'elapsed': self._elapsed,
+            'roundsPerSecond': self.getRoundsPerSecond(),
+            'meanLength': sum(lengths) / len(lengths) if lengths else 0.0,
+            'minLength': lengths[0] if lengths else 0,
+            'maxLength': lengths[-1] if lengths else 0,
+            'players': {},
+        }
+        for name, entry in self._stats.items():
+            latencies = sorted(entry['latencies'])
+            summary['players'][name] = {
+                'wins': entry['wins'],
+                'losses': entry['losses'],
+                'draws': entry['draws'],
+                'winRate': self.getWinRate(name),
+                'meanMoveLatency': sum(latencies) / len(latencies) if latencies else 0.0,
+                'p50MoveLatency': _percentile(latencies, 0.50),
+                'p95MoveLatency': _percentile(latencies, 0.95),
+                'maxMoveLatency': latencies[-1] if latencies else 0.0,
+            }
+        return summary
+
+    def print(self):
+        summary = self.getSummary()
+        print(f"{summary['rounds']} rounds in {summary['elapsed']:.2f}s ({summary['roundsPerSecond']:.1f} rounds/s)")
+        print(f"Game length: mean {summary['meanLength']:.1f}, min {summary['minLength']}, max {summary['maxLength']}")
+        for name, player in summary['players'].items():
+            print(f"{name}: {player['wins']}W {player['losses']}L {player['draws']}D "
+                  f"({player['winRate']:.1%}), move latency mean {player['meanMoveLatency'] * 1e6:.0f}us "
+                  f"p95 {player['p95MoveLatency'] * 1e6:.0f}us")
+
+
+class Tournament:
+    def __init__(self, strategies, rows=6, columns=7, connectN=4, seed=0):
+        self._strategies = {}
+        for strategy in strategies:
+            if strategy.getName() in self._strategies:
+                raise ValueError(f'Duplicate strategy {strategy.getName()}')
+            self._strategies[strategy.getName()] = strategy
+        if len(self._strategies) < 2:
+            raise ValueError('A tournament needs at least two strategies')
+        self._rows = rows
+        self._columns = columns
+        self._connectN = connectN
+        self._seed = seed
+
+    def getPairings(self):
+        names = list(self._strategies)
+        return [(names[i], names[j]) for i in range(len(names)) for j in range(i + 1, len(names))]
+
+    def _makeTasks(self, roundsPerPairing, chunkSize, record):
+        rounds = [(pairing, r) for pairing in self.getPairings() for r in range(roundsPerPairing)]
+        for start in range(0, len(rounds), chunkSize):
+            yield (self._strategies, self._rows, self._columns, self._connectN, self._seed,
+                   rounds[start:start + chunkSize], record)
+
+    def run(self, roundsPerPairing, workers=None, chunkSize=64, recordPath=None):
+        # Each pairing plays roundsPerPairing rounds, swapping the first player every round
+        result = TournamentResult()
+        start = time.perf_counter()
+        tasks = self._makeTasks(roundsPerPairing, chunkSize, recordPath is not None)
+        writer = GameRecordWriter(recordPath, self._rows, self._columns, self._connectN) if recordPath else None
+        executor = None
+        if workers != 1:
+            from concurrent.futures import ProcessPoolExecutor
+            executor = ProcessPoolExecutor(max_workers=workers)
+        try:
+            outputs = executor.map(_playTournamentChunk, tasks) if executor else map(_playTournamentChunk, tasks)
+            for stats, lengths, games in outputs:
+                result.merge(stats, lengths)
+                if writer:
+                    for moves in games:
+                        writer.writeGame(moves)
+        finally:
+            if executor:
+                executor.shutdown()
+            if writer:
+                writer.close()
+        result.setElapsed(time.perf_counter() - start)
+        return result
+
+
+def benchmarkTournamentScaling(tournament, roundsPerPairing, workerCounts=None):
+    if workerCounts is None:
+        cores = os.cpu_count() or 1
+        workerCounts = sorted({1, 2, 4, cores} & set(range(1, cores + 1)))
+    baseline = None
+    report = []
+    for workers in workerCounts:
+        result = tournament.run(roundsPerPairing, workers=workers)
+        rate = result.getRoundsPerSecond()
+        baseline = baseline or rate
+        report.append((workers, rate, rate / baseline))
+        print(f"{workers} worker(s): {rate:.1f} rounds/s, speedup {rate / baseline:.2f}x")
+    return report
+
+
+# Game record archive: a header followed by one record per game. Each record is a little-endian
+# uint16 move count and then one byte per move holding the column that was played.
+RECORD_MAGIC = b'C4GR'
+RECORD_VERSION = 1
+_RECORD_HEADER = struct.Struct('<4sBHHB')
+_RECORD_LENGTH = struct.Struct('<H')
+
+
+class GameRecordWriter:
+    def __init__(self, path, rows, columns, connectN):
+        if columns > 256:
+            raise ValueError('Game records store one byte per move and support at most 256 columns')
+        self._file = open(path, 'wb')
+        self._file.write(_RECORD_HEADER.pack(RECORD_MAGIC, RECORD_VERSION, rows, columns, connectN))
+        self._columns = columns
+        self._gameCount = 0
+
+    def writeGame(self, moves):
+        if len(moves) > 0xFFFF:
+            raise ValueError('Game is too long to record')
+        self._file.write(_RECORD_LENGTH.pack(len(moves)))
+        self._file.write(bytes(moves))
+        self._gameCount += 1
+
+    def getGameCount(self):
+        return self._gameCount
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class GameRecordReader:
+    def __init__(self, path, bufferSize=1 << 20):
+        self._file = open(path, 'rb', buffering=bufferSize)
+        header = self._file.read(_RECORD_HEADER.size)
+        if len(header) != _RECORD_HEADER.size:
+            raise ValueError('Truncated game record header')
+        magic, version, self._rows, self._columns, self._connectN = _RECORD_HEADER.unpack(header)
+        if magic != RECORD_MAGIC or version != RECORD_VERSION:
+            raise ValueError('Not a game record archive')
+        self._buffer = bytearray(0xFFFF)
+
+    def getRowCount(self):
+        return self._rows
+
+    def getColumnCount(self):
+        return self._columns
+
+    def getConnectN(self):
+        return self._connectN
+
+    def __iter__(self):
+        # Yields a view over a reused buffer; copy it with bytes() to keep a game past the next step
+        view = memoryview(self._buffer)
+        lengthBuffer = bytearray(_RECORD_LENGTH.size)
+        while True:
+            read = self._file.readinto(lengthBuffer)
+            if read == 0:
+                return
+            if read != len(lengthBuffer):
+                raise ValueError('Truncated game record')
+            length = _RECORD_LENGTH.unpack(lengthBuffer)[0]
+            if self._file.readinto(view[:length]) != length:
+                raise ValueError('Truncated game record')
+            yield view[:length]
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def replayGameRecords(reader):
+    # Replays every game through one shared Grid, yielding (winner seat or None, moves played)
+    grid = Grid(reader.getRowCount(), reader.getColumnCount())
+    connectN = reader.getConnectN()
+    grid.enableThreatTracking(connectN)
+    pieces = (GridPosition.YELLOW, GridPosition.RED)
+    for moves in reader:
+        grid.initGrid()
+        winner = None
+        for index, column in enumerate(moves):
+            if winner is not None:
+                raise ValueError('Game record continues after a win')
+            piece = pieces[index & 1]
+            row = grid.placePiece(column, piece)
+            if grid.checkWin(connectN, row, column, piece):
+                winner = index & 1
+        yield winner, moves
+
+
+def analyzeGameRecords(path, openingDepth=4, topOpenings=10):
+    # One streaming pass; memory is bounded by the number of distinct openings, at most columns ** openingDepth
+    games = wins = losses = draws = totalLength = 0
+    openings = Counter()
+    with GameRecordReader(path) as reader:
+        for winner, moves in replayGameRecords(reader):
+            games += 1
+            totalLength += len(moves)
+            if winner is None:
+                draws += 1
+            elif winner == 0:
+                wins += 1
+            else:
+                losses += 1
+            if len(moves) >= openingDepth:
+                openings[bytes(moves[:openingDepth])] += 1
+    return {
+        'games': games,
+        'firstPlayerWinRate': wins / games if games else 0.0,
+        'secondPlayerWinRate': losses / games if games else 0.0,
+        'drawRate': draws / games if games else 0.0,
+        'meanLength': totalLength / games if games else 0.0,
+        'openings': [(list(opening), count) for opening, count in openings.most_common(topOpenings)],
+    }
+
+
+def main():
+    grid = Grid(6,7)
+    game = Game(grid, 4, 2)
+    game.play()
+
+
+if __name__ == '__main__':
+    main()
@@ -18,6 +18,13 @@ class User:
     def getId(self):
         return self._id
     
+import heapq
+import itertools
+import os
+import time
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict, deque
 from enum import Enum
 
 class MovieRating(Enum):
@@ -29,64 +36,1327 @@ class MovieRating(Enum):
     FIVE = 5
 
 
+class SparseRatingStore:
+    # Ratings keyed by dense user and movie indices, kept twice: user-major (CSR) and movie-major
+    # (CSC), with int32 indices and int8 values. New ratings land in a delta buffer that is merged
+    # into the compressed arrays once it grows past a fraction of the store.
+    def __init__(self, mergeThreshold=4096, mergeRatio=0.125):
+        self._userIds = []
+        self._userIndex = {}
+        self._movieIds = []
+        self._movieIndex = {}
+
+        self._userPtr = array('q', [0])     # Row offsets into _userCols/_userVals
+        self._userCols = array('i')         # Movie index of each rating, sorted within a row
+        self._userVals = array('b')
+        self._moviePtr = array('q', [0])
+        self._movieRows = array('i')        # User index of each rating, sorted within a column
+        self._movieVals = array('b')
+
+        self._deltaByUser = {}              # Map<UserIndex, Map<MovieIndex, Value>>
+        self._deltaByMovie = {}             # Map<MovieIndex, Map<UserIndex, Value>>
+        self._deltaSize = 0
+        self._deltaLog = []                 # User index of each set() since the last merge
+        self._merges = 0
+        self._pendingBatches = []           # Bulk-loaded (user indices, movie indices, values) arrays
+        self._pendingSize = 0
+        self._mergeThreshold = mergeThreshold
+        self._mergeRatio = mergeRatio
+        self._version = 0
+
+        self._movieSums = array('q')        # Running rating sum per movie
+        self._movieCounts = array('i')      # Running rating count per movie
+        self._ratingSum = 0
+        self._ratingCount = 0
+
+    def getUserIndex(self, userId, create=False):
+        index = self._userIndex.get(userId)
+        if index is None and create:
+            index = self._userIndex[userId] = len(self._userIds)
+            self._userIds.append(userId)
+        return index
+
+    def getMovieIndex(self, movieId, create=False):
+        index = self._movieIndex.get(movieId)
+        if index is None and create:
+            index = self._movieIndex[movieId] = len(self._movieIds)
+            self._movieIds.append(movieId)
+            self._movieSums.append(0)
+            self._movieCounts.append(0)
+        return index
+
+    def getUserId(self, userIndex):
+        return self._userIds[userIndex]
+
+    def getMovieId(self, movieIndex):
+        return self._movieIds[movieIndex]
+
+    def getUserCount(self):
+        return len(self._userIds)
+
+    def getMovieCount(self):
+        return len(self._movieIds)
+
+    def getVersion(self):
+        # Advances by one per rating written, but not when a rating is set to its current value
+        return self._version
+
+    def getRatingCount(self):
+        if self._pendingBatches:
+            self.merge()
+        return self._ratingCount
+
+    def getMovieRatingCount(self, movieIndex):
+        if self._pendingBatches:
+            self.merge()
+        return self._movieCounts[movieIndex]
+
+    def getMovieRatingSum(self, movieIndex):
+        if self._pendingBatches:
+            self.merge()
+        return self._movieSums[movieIndex]
+
+    def getRatingSum(self):
+        if self._pendingBatches:
+            self.merge()
+        return self._ratingSum
+
+    def set(self, userIndex, movieIndex, value):
+        # Returns the previous value, or None if the movie was not rated by the user
+        previous = self.get(userIndex, movieIndex)
+        if previous == value:
+            return previous
+        if previous is None:
+            self._movieCounts[movieIndex] += 1
+            self._ratingCount += 1
+        change = value - (previous or 0)
+        self._movieSums[movieIndex] += change
+        self._ratingSum += change
+        userDelta = self._deltaByUser.setdefault(userIndex, {})
+        if movieIndex not in userDelta:
+            self._deltaSize += 1
+        userDelta[movieIndex] = value
+        self._deltaByMovie.setdefault(movieIndex, {})[userIndex] = value
+        self._deltaLog.append(userIndex)
+        self._version += 1
+        if self._deltaSize >= max(self._mergeThreshold, len(self._userCols) * self._mergeRatio):
+            self.merge()
+        return previous
+
+    def _baseRange(self, ptr, index):
+        if index + 1 < len(ptr):
+            return ptr[index], ptr[index + 1]
+        return 0, 0
+
+    def get(self, userIndex, movieIndex):
+        if self._pendingBatches:
+            self.merge()
+        userDelta = self._deltaByUser.get(userIndex)
+        if userDelta and movieIndex in userDelta:
+            return userDelta[movieIndex]
+        start, end = self._baseRange(self._userPtr, userIndex)
+        position = bisect_left(self._userCols, movieIndex, start, end)
+        if position < end and self._userCols[position] == movieIndex:
+            return self._userVals[position]
+        return None
+
+    def _iterRatings(self, byUser, index):
+        if self._pendingBatches:
+            self.merge()
+        if byUser:
+            ptr, indices, values, delta = self._userPtr, self._userCols, self._userVals, self._deltaByUser
+        else:
+            ptr, indices, values, delta = self._moviePtr, self._movieRows, self._movieVals, self._deltaByMovie
+        start, end = self._baseRange(ptr, index)
+        pending = delta.get(index)
+        for position in range(start, end):
+            other = indices[position]
+            if not pending or other not in pending:
+                yield other, values[position]
+        if pending:
+            yield from pending.items()
+
+    def iterUserRatings(self, userIndex):
+        # (movie index, value) pairs
+        return self._iterRatings(True, userIndex)
+
+    def iterMovieRatings(self, movieIndex):
+        # (user index, value) pairs
+        return self._iterRatings(False, movieIndex)
+
+    def addBulk(self, userIndices, movieIndices, values):
+        # NumPy arrays of dense indices and values; later entries win over earlier ones and over
+        # ratings already stored. Batches are merged together once they outgrow a fraction of the store.
+        self._pendingBatches.append((userIndices, movieIndices, values))
+        self._pendingSize += len(values)
+        self._version += len(values)
+        if self._pendingSize >= max(self._mergeThreshold, len(self._userCols) * self._mergeRatio):
+            self.merge()
+
+    def merge(self):
+        if not self._deltaSize and not self._pendingBatches:
+            return
+        np = _importNumpy()
+        if np is None:
+            self._mergeDelta()
+        else:
+            self._mergeBatches(np)
+        self._deltaLog = []
+        self._merges += 1
+
+    def _mergeBatches(self, np):
+        # Single sets always flush pending batches first, so the delta buffer is older than them
+        batches = list(self._pendingBatches)
+        if self._deltaSize:
+            users = np.fromiter((u for u, row in self._deltaByUser.items() for _ in row), np.int64, self._deltaSize)
+            movies = np.fromiter((m for row in self._deltaByUser.values() for m in row), np.int64, self._deltaSize)
+            values = np.fromiter((v for row in self._deltaByUser.values() for v in row.values()), np.int8, self._deltaSize)
+            batches.insert(0, (users, movies, values))
+
+        userCount, movieCount = len(self._userIds), len(self._movieIds)
+        baseUsers = len(self._userPtr) - 1
+        owners = np.repeat(np.arange(baseUsers, dtype=np.int64), np.diff(np.frombuffer(self._userPtr, dtype=np.int64)))
+        keys = [owners * movieCount + np.frombuffer(self._userCols, dtype=np.int32)]
+        values = [np.frombuffer(self._userVals, dtype=np.int8)]
+        for users, movies, batchValues in batches:
+            keys.append(np.asarray(users, dtype=np.int64) * movieCount + np.asarray(movies, dtype=np.int64))
+            values.append(np.asarray(batchValues, dtype=np.int8))
+        keys = np.concatenate(keys)[::-1]
+        values = np.concatenate(values)[::-1]
+        # np.unique keeps the first occurrence in the reversed order, i.e. the latest rating, and
+        # returns the keys sorted, which is exactly user-major order
+        keys, first = np.unique(keys, return_index=True)
+        values = values[first]
+        users = (keys // movieCount).astype(np.int32)
+        movies = (keys % movieCount).astype(np.int32)
+        userPtr = np.concatenate([[0], np.cumsum(np.bincount(users, minlength=userCount))])
+        order = np.lexsort((users, movies))
+        moviePtr = np.concatenate([[0], np.cumsum(np.bincount(movies, minlength=movieCount))])
+
+        def toArray(typecode, data):
+            result = array(typecode)
+            result.frombytes(np.ascontiguousarray(data).tobytes())
+            return result
+
+        self._userPtr, self._userCols, self._userVals = toArray('q', userPtr.astype(np.int64)), toArray('i', movies), toArray('b', values)
+        self._moviePtr = toArray('q', moviePtr.astype(np.int64))
+        self._movieRows, self._movieVals = toArray('i', users[order]), toArray('b', values[order])
+        self._movieSums = toArray('q', np.bincount(movies, values, minlength=movieCount).astype(np.int64))
+        self._movieCounts = toArray('i', np.bincount(movies, minlength=movieCount).astype(np.int32))
+        self._ratingSum = int(values.sum(dtype=np.int64))
+        self._ratingCount = len(values)
+        self._deltaByUser.clear()
+        self._deltaByMovie.clear()
+        self._deltaSize = 0
+        self._pendingBatches = []
+        self._pendingSize = 0
+
+    def _mergeDelta(self):
+        userPtr, userCols, userVals = array('q', [0]), array('i'), array('b')
+        for userIndex in range(len(self._userIds)):
+            row = dict(self._iterRatings(True, userIndex))
+            for movieIndex in sorted(row):
+                userCols.append(movieIndex)
+                userVals.append(row[movieIndex])
+            userPtr.append(len(userCols))
+
+        # Counting sort of the CSR entries by movie gives the CSC view with rows already in order
+        counts = [0] * (len(self._movieIds) + 1)
+        for movieIndex in userCols:
+            counts[movieIndex + 1] += 1
+        for i in range(len(self._movieIds)):
+            counts[i + 1] += counts[i]
+        moviePtr = array('q', counts)
+        movieRows = array('i', bytes(4 * len(userCols)))
+        movieVals = array('b', bytes(len(userCols)))
+        cursor = counts[:-1]
+        for userIndex in range(len(self._userIds)):
+            for position in range(userPtr[userIndex], userPtr[userIndex + 1]):
+                movieIndex = userCols[position]
+                movieRows[cursor[movieIndex]] = userIndex
+                movieVals[cursor[movieIndex]] = userVals[position]
+                cursor[movieIndex] += 1
+
+        self._userPtr, self._userCols, self._userVals = userPtr, userCols, userVals
+        self._moviePtr, self._movieRows, self._movieVals = moviePtr, movieRows, movieVals
+        self._deltaByUser.clear()
+        self._deltaByMovie.clear()
+        self._deltaSize = 0
+
+    def getArrays(self):
+        # Merged CSR and CSC arrays: (userPtr, userCols, userVals, moviePtr, movieRows, movieVals)
+        self.merge()
+        return (self._userPtr, self._userCols, self._userVals,
+                self._moviePtr, self._movieRows, self._movieVals)
+
+    def getBaseArrays(self):
+        # The compressed arrays without the delta buffer folded in; bulk batches are merged first
+        if self._pendingBatches:
+            self.merge()
+        return (self._userPtr, self._userCols, self._userVals,
+                self._moviePtr, self._movieRows, self._movieVals)
+
+    def getMergeCount(self):
+        # Changes whenever the base arrays are rebuilt
+        return self._merges
+
+    def getDeltaLog(self):
+        # User indices changed by set() since the last merge, in order, with repeats
+        return self._deltaLog
+
+    def getDeltaRow(self, userIndex):
+        # Map<MovieIndex, Value> of the user's ratings in the delta buffer, or None
+        return self._deltaByUser.get(userIndex)
+
+    def getDeltaColumn(self, movieIndex):
+        # Map<UserIndex, Value> of the movie's ratings in the delta buffer, or None
+        return self._deltaByMovie.get(movieIndex)
+
+    def getArrayBytes(self):
+        arrays = (self._userPtr, self._userCols, self._userVals, self._moviePtr, self._movieRows, self._movieVals)
+        return sum(a.itemsize * len(a) for a in arrays)
+
+
 class RatingRegister:
     def __init__(self):
-        self._userMovies = {}   # Map<UserId, List<Movie>>
-        self._movieRatings = {} # Map<MovieId, Map<UserId, Rating>>
+        self._store = SparseRatingStore()
+
+        self._movies = []       # List<Movie>, by movie index
+        self._users = []        # List<User>, by user index
+        self._listeners = []
+        self._placeholders = False  # Bulk-loaded users or movies without objects yet
+        self._placeholderUsers = set()  # Indices of users and movies created without a name or title
+        self._placeholderMovies = set()
+
+        self._popular = None
+        self._popularVersion = None
+        self._popularSize = 100
+        self._popularStaleness = 0.01   # Writes tolerated between rebuilds, as a fraction of all ratings
+        self._popularRebuilds = 0
 
-        self._movies = []       # List<Movie>
-        self._users = []        # List<User>
+    def getStore(self):
+        return self._store
+
+    def addListener(self, listener):
+        # listener(userIndex, movieIndex, previousValue, value) runs after every addRating
+        self._listeners.append(listener)
 
     def addRating(self, user, movie, rating):
-        if movie.getId() not in self._movieRatings:
-            self._movieRatings[movie.getId()] = {}
-            self._movies.append(movie)
-        if user.getId() not in self._userMovies:
-            self._userMovies[user.getId()] = []
-            self._users.append(user)
-        self._userMovies[user.getId()].append(movie)
-        self._movieRatings[movie.getId()][user.getId()] = rating
+        movieIndex = self._store.getMovieIndex(movie.getId(), create=True)
+        self._adopt(self._movies, self._placeholderMovies, movieIndex, movie)
+        userIndex = self._store.getUserIndex(user.getId(), create=True)
+        self._adopt(self._users, self._placeholderUsers, userIndex, user)
+        previous = self._store.set(userIndex, movieIndex, rating.value)
+        for listener in self._listeners:
+            listener(userIndex, movieIndex, previous, rating.value)
+
+    @staticmethod
+    def _adopt(objects, placeholders, index, item):
+        # Keeps the first object seen for an index, but replaces the stand-in of a bulk-loaded id
+        if index == len(objects):
+            objects.append(item)
+        elif objects[index] is None or index in placeholders:
+            objects[index] = item
+            placeholders.discard(index)
 
     def getAverageRating(self, movie):
-        if movie.getId() not in self._movieRatings:
+        movieIndex = self._store.getMovieIndex(movie.getId())
+        if movieIndex is None or not self._store.getMovieRatingCount(movieIndex):
             return MovieRating.NOT_RATED.value
-        ratings = self._movieRatings[movie.getId()].values()
-        ratingValues = [rating.value for rating in ratings]
-        return sum(ratingValues) / len(ratings)
+        return self._store.getMovieRatingSum(movieIndex) / self._store.getMovieRatingCount(movieIndex)
+
+    def getWeightedRating(self, movieIndex, priorMean, priorWeight):
+        # Bayesian average: the movie's ratings plus priorWeight virtual ratings at priorMean
+        total = self._store.getMovieRatingSum(movieIndex)
+        count = self._store.getMovieRatingCount(movieIndex)
+        return (priorWeight * priorMean + total) / (priorWeight + count)
+
+    def getPopularMovies(self, count=10):
+        # Movie indices ordered by Bayesian-weighted average, best first. The prior is the global mean
+        # rating weighted by the mean number of ratings per movie, so a single 5 star rating does not
+        # beat a well-rated classic. One write moves every weighted rating through the prior, so the
+        # ranking cannot be patched in place; it is rebuilt once the writes since the last rebuild reach
+        # 1% of all ratings, which bounds the rebuilds to one per that many writes on a large store.
+        version = self._store.getVersion()
+        ratingCount = self._store.getRatingCount()
+        if not ratingCount:
+            return []
+        if self._popular is None or len(self._popular) < count or \
+                version - self._popularVersion >= max(1, ratingCount * self._popularStaleness):
+            movieCount = self._store.getMovieCount()
+            priorMean = self._store.getRatingSum() / ratingCount
+            priorWeight = ratingCount / movieCount
+            size = max(count, self._popularSize)
+            self._popular = heapq.nlargest(
+                size, range(movieCount),
+                key=lambda movieIndex: (self.getWeightedRating(movieIndex, priorMean, priorWeight), -movieIndex))
+            self._popularVersion = version
+            self._popularRebuilds += 1
+        return self._popular[:count]
+
+    def getPopularVersion(self):
+        # Changes whenever getPopularMovies rebuilds its ranking
+        return self._popularRebuilds
+
+    def addRatingsBulk(self, userIds, movieIds, values):
+        # NumPy arrays of ids and rating values. Ids are mapped to indices once per distinct id, not
+        # per row, and User/Movie objects for new ids are only created when getUsers/getMovies is called.
+        # Listeners are told once per affected user, with movieIndex, previous and value set to None.
+        np = _importNumpy()
+        if np is None:
+            raise ImportError('Bulk loading requires numpy')
+        store = self._store
+        uniqueUsers, userInverse = np.unique(userIds, return_inverse=True)
+        uniqueMovies, movieInverse = np.unique(movieIds, return_inverse=True)
+        userIndices = np.fromiter((store.getUserIndex(u, create=True) for u in uniqueUsers.tolist()), np.int64, len(uniqueUsers))
+        movieIndices = np.fromiter((store.getMovieIndex(m, create=True) for m in uniqueMovies.tolist()), np.int64, len(uniqueMovies))
+        for objects, count in ((self._users, store.getUserCount()), (self._movies, store.getMovieCount())):
+            if len(objects) < count:
+                objects.extend([None] * (count - len(objects)))
+                self._placeholders = True
+        store.addBulk(userIndices[userInverse.ravel()], movieIndices[movieInverse.ravel()], values)
+        for userIndex in userIndices.tolist():
+            for listener in self._listeners:
+                listener(userIndex, None, None, None)
+
+    def _materialize(self):
+        for index, user in enumerate(self._users):
+            if user is None:
+                self._users[index] = User(self._store.getUserId(index), None)
+                self._placeholderUsers.add(index)
+        for index, movie in enumerate(self._movies):
+            if movie is None:
+                self._movies[index] = Movie(self._store.getMovieId(index), None)
+                self._placeholderMovies.add(index)
+        self._placeholders = False
 
     def getUsers(self):
+        if self._placeholders:
+            self._materialize()
         return self._users
 
     def getMovies(self):
+        if self._placeholders:
+            self._materialize()
         return self._movies
 
     def getUserMovies(self, user):
-        return self._userMovies.get(user.getId(), [])
+        userIndex = self._store.getUserIndex(user.getId())
+        if userIndex is None:
+            return []
+        movies = self.getMovies()
+        return [movies[movieIndex] for movieIndex, _ in self._store.iterUserRatings(userIndex)]
 
     def getMovieRatings(self, movie):
-        return self._movieRatings.get(movie.getId(), {})
-    
+        movieIndex = self._store.getMovieIndex(movie.getId())
+        if movieIndex is None:
+            return {}
+        users = self.getUsers()
+        return {users[userIndex].getId(): MovieRating(value)
+                for userIndex, value in self._store.iterMovieRatings(movieIndex)}
+
+
+def _importNumpy():
+    # NumPy is optional; without it MovieRecommendation uses the pure Python similarity scan
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def _smallest(np, values, k):
+    # Positions of the k smallest values in ascending order, ties broken by position. argpartition
+    # avoids a full sort; ties at the k-th value are resolved explicitly so the result is deterministic.
+    positions = np.arange(len(values))
+    if len(values) > k:
+        kth = np.partition(values, k - 1)[k - 1]
+        closer = positions[values < kth]
+        positions = np.concatenate([closer, positions[values == kth][:k - len(closer)]])
+    return positions[np.lexsort((positions, values[positions]))]
+
+
+class SimilarityEngine:
+    # Distances from one user to every other user computed with a handful of vectorized operations
+    # over the store's CSR/CSC arrays. Lower is more similar for every metric:
+    #   absolute: sum of absolute rating differences over co-rated movies (the original score)
+    #   cosine:   1 - cosine similarity of the raw rating vectors
+    #   pearson:  1 - cosine similarity of the mean-centered rating vectors
+    # Users without a co-rated movie are at distance inf. Ratings still in the store's delta buffer
+    # are overlaid on the compressed arrays, so a change only updates the changed users' means and
+    # norms; the arrays are reloaded only when the store merges.
+    METRICS = ('absolute', 'cosine', 'pearson')
+
+    def __init__(self, store):
+        self._np = _importNumpy()
+        if self._np is None:
+            raise ImportError('SimilarityEngine requires numpy')
+        self._store = store
+        self._version = None
+        self._merges = None
+        self._logPosition = 0
+
+    @classmethod
+    def fromArrays(cls, userCount, arrays, statistics=None):
+        # Build from (userPtr, userCols, userVals, moviePtr, movieRows, movieVals) without a store.
+        # statistics are (means, norms, centered norms) from userStatistics, computed here if omitted.
+        engine = cls.__new__(cls)
+        engine._np = _importNumpy()
+        engine._store = None
+        engine._version = None
+        engine._load(userCount, arrays, statistics)
+        return engine
+
+    @staticmethod
+    def userStatistics(userCount, arrays):
+        # Per-user rating mean, norm and mean-centered norm over the CSR arrays
+        np = _importNumpy()
+        userPtr, userVals = np.asarray(arrays[0]), np.asarray(arrays[2])
+        # Users added since the arrays were built have no row yet
+        owners = np.repeat(np.arange(len(userPtr) - 1), np.diff(userPtr))
+        counts = np.bincount(owners, minlength=userCount)
+        values = userVals.astype(np.float64)
+        means = np.bincount(owners, values, minlength=userCount) / np.maximum(counts, 1)
+        norms = np.sqrt(np.bincount(owners, values * values, minlength=userCount))
+        centered = values - means[owners]
+        return means, norms, np.sqrt(np.bincount(owners, centered * centered, minlength=userCount))
+
+    def _refresh(self):
+        store = self._store
+        if store is None or self._version == store.getVersion():
+            return
+        arrays = store.getBaseArrays()
+        if self._merges != store.getMergeCount():
+            self._load(store.getUserCount(), arrays)
+            self._merges = store.getMergeCount()
+            self._logPosition = 0
+        else:
+            self._resize(store.getUserCount())
+        log = store.getDeltaLog()
+        for userIndex in set(log[self._logPosition:]):
+            self._updateUser(userIndex)
+        self._logPosition = len(log)
+        self._version = store.getVersion()
+
+    def _load(self, userCount, arrays, statistics=None):
+        np = self._np
+        userPtr, userCols, userVals, moviePtr, movieRows, movieVals = (
+            a if isinstance(a, np.ndarray) else np.frombuffer(a, dtype=dtype)
+            for a, dtype in zip(arrays, (np.int64, np.int32, np.int8, np.int64, np.int32, np.int8)))
+        self._userCount = userCount
+        self._userPtr, self._userCols, self._userVals = userPtr, userCols, userVals
+        self._moviePtr, self._movieRows, self._movieVals = moviePtr, movieRows, movieVals
+        if statistics is None:
+            statistics = self.userStatistics(userCount, (userPtr, userCols, userVals))
+        self._means, self._norms, self._centeredNorms = statistics
+
+    def _resize(self, userCount):
+        np = self._np
+        missing = userCount - len(self._means)
+        if missing > 0:
+            self._means = np.concatenate([self._means, np.zeros(missing)])
+            self._norms = np.concatenate([self._norms, np.zeros(missing)])
+            self._centeredNorms = np.concatenate([self._centeredNorms, np.zeros(missing)])
+        self._userCount = userCount
+
+    def _updateUser(self, userIndex):
+        np = self._np
+        values = self._userRow(userIndex)[1].astype(np.float64)
+        mean = values.mean() if len(values) else 0.0
+        centered = values - mean
+        self._means[userIndex] = mean
+        self._norms[userIndex] = np.sqrt(values @ values)
+        self._centeredNorms[userIndex] = np.sqrt(centered @ centered)
+
+    def _userRow(self, userIndex):
+        np = self._np
+        if userIndex + 1 < len(self._userPtr):
+            start, end = self._userPtr[userIndex], self._userPtr[userIndex + 1]
+        else:
+            start = end = 0
+        movies, values = self._userCols[start:end], self._userVals[start:end]
+        delta = self._store.getDeltaRow(userIndex) if self._store is not None else None
+        if delta:
+            deltaMovies = np.fromiter(delta, np.int32, len(delta))
+            deltaValues = np.fromiter(delta.values(), np.int8, len(delta))
+            keep = ~np.isin(movies, deltaMovies)
+            movies = np.concatenate([movies[keep], deltaMovies])
+            values = np.concatenate([values[keep], deltaValues])
+            order = np.argsort(movies)
+            movies, values = movies[order], values[order]
+        return movies, values
+
+    def getUserCount(self):
+        self._refresh()
+        return self._userCount
+
+    def getUserRatings(self, userIndex):
+        # (movie indices, values) of one user
+        self._refresh()
+        return self._userRow(userIndex)
+
+    def _gather(self, movies, ratings):
+        # (reviewer, my rating, their rating) for every rating of the given movies, which are sorted
+        np = self._np
+        base = movies[:np.searchsorted(movies, len(self._moviePtr) - 1)]
+        starts = self._moviePtr[base]
+        lengths = self._moviePtr[base + 1] - starts
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        reviewers = self._movieRows[offsets]
+        mine = np.repeat(ratings[:len(base)], lengths)
+        theirs = self._movieVals[offsets]
+        if self._store is None or not self._store.getDeltaLog():
+            return reviewers, mine.astype(np.float64), theirs.astype(np.float64)
+
+        # Ratings in the delta buffer replace the base rating of the same reviewer and movie
+        deltaReviewers, deltaMovies, deltaMine, deltaTheirs = [], [], [], []
+        for movieIndex, rating in zip(movies.tolist(), ratings.tolist()):
+            column = self._store.getDeltaColumn(movieIndex)
+            if column:
+                deltaReviewers.extend(column)
+                deltaTheirs.extend(column.values())
+                deltaMovies.extend([movieIndex] * len(column))
+                deltaMine.extend([rating] * len(column))
+        if not deltaReviewers:
+            return reviewers, mine.astype(np.float64), theirs.astype(np.float64)
+        stride = self._store.getMovieCount()
+        deltaReviewers = np.array(deltaReviewers, dtype=np.int64)
+        deltaKeys = deltaReviewers * stride + np.array(deltaMovies, dtype=np.int64)
+        keep = ~np.isin(reviewers.astype(np.int64) * stride + np.repeat(base, lengths), deltaKeys)
+        return (np.concatenate([reviewers[keep], deltaReviewers]),
+                np.concatenate([mine[keep], deltaMine]).astype(np.float64),
+                np.concatenate([theirs[keep], deltaTheirs]).astype(np.float64))
+
+    def candidateDistances(self, userIndex, metric='absolute'):
+        # (user indices, distances) of the users sharing a rated movie with userIndex, by user index.
+        # Work is proportional to the co-ratings gathered, not to the number of users.
+        np = self._np
+        if metric not in self.METRICS:
+            raise ValueError(f'Unknown metric {metric}')
+        self._refresh()
+        movies, ratings = self._userRow(userIndex)
+        reviewers, mine, theirs = self._gather(movies, ratings)
+        candidates, inverse = np.unique(reviewers, return_inverse=True)
+        if metric == 'absolute':
+            scores = np.bincount(inverse, np.abs(mine - theirs), minlength=len(candidates))
+        else:
+            if metric == 'cosine':
+                norms = self._norms
+            else:
+                mine = mine - self._means[userIndex]
+                theirs = theirs - self._means[reviewers]
+                norms = self._centeredNorms
+            dots = np.bincount(inverse, mine * theirs, minlength=len(candidates))
+            denominators = norms[candidates] * norms[userIndex]
+            similarity = np.divide(dots, denominators, out=np.zeros_like(dots), where=denominators > 0)
+            scores = 1.0 - similarity
+        others = candidates != userIndex
+        return candidates[others], scores[others]
+
+    def distances(self, userIndex, metric='absolute'):
+        # Dense distances to every user, inf where nothing is co-rated
+        candidates, scores = self.candidateDistances(userIndex, metric)
+        distances = self._np.full(self._userCount, self._np.inf)
+        distances[candidates] = scores
+        return distances
+
+    def topNeighbours(self, userIndex, k, metric='absolute'):
+        # Up to k (user indices, distances) sorted by distance, closest first, ties by user index
+        candidates, distances = self.candidateDistances(userIndex, metric)
+        closest = _smallest(self._np, distances, k)
+        return candidates[closest], distances[closest]
+
+
+def _initNeighbourWorker(userCount, arrays):
+    global _workerEngine
+    _workerEngine = SimilarityEngine.fromArrays(userCount, arrays)
+
+
+def _computeNeighbourShard(task):
+    start, end, k, metric = task
+    np = _importNumpy()
+    neighbours = np.full((end - start, k), -1, dtype=np.int32)
+    distances = np.full((end - start, k), np.inf)
+    for row, userIndex in enumerate(range(start, end)):
+        found, foundDistances = _workerEngine.topNeighbours(userIndex, k, metric)
+        neighbours[row, :len(found)] = found
+        distances[row, :len(found)] = foundDistances
+    return start, neighbours, distances
+
+
+class NeighbourIndex:
+    # Each user's k closest reviewers, sorted closest first (-1 / inf pad short rows). The index
+    # listens to the register: a changed user is queued and, on the next lookup, its distance
+    # vector is computed once and patched into every row it enters or leaves. All metrics are
+    # symmetric, so one vector is enough. Rows that lose a neighbour without a replacement in
+    # hand are recomputed.
+    def __init__(self, ratings, k=20, metric='absolute'):
+        self._np = _importNumpy()
+        if self._np is None:
+            raise ImportError('NeighbourIndex requires numpy')
+        self._ratings = ratings
+        self._store = ratings.getStore()
+        self._engine = SimilarityEngine(self._store)
+        self._k = k
+        self._metric = metric
+        self._neighbours = self._np.full((0, k), -1, dtype=self._np.int32)
+        self._distances = self._np.full((0, k), self._np.inf)
+        self._dirty = set()
+        self._stale = set()
+        ratings.addListener(self._onRatingChanged)
+
+    def _onRatingChanged(self, userIndex, movieIndex, previous, value):
+        if previous is not None and previous == value:
+            return
+        self._dirty.add(userIndex)
+
+    def build(self, workers=None, shardSize=1024):
+        from concurrent.futures import ProcessPoolExecutor
+        np = self._np
+        userCount = self._store.getUserCount()
+        arrays = self._store.getArrays()
+        self._neighbours = np.full((userCount, self._k), -1, dtype=np.int32)
+        self._distances = np.full((userCount, self._k), np.inf)
+        tasks = [(start, min(start + shardSize, userCount), self._k, self._metric)
+                 for start in range(0, userCount, shardSize)]
+        with ProcessPoolExecutor(max_workers=workers, initializer=_initNeighbourWorker,
+                                 initargs=(userCount, arrays)) as executor:
+            for start, neighbours, distances in executor.map(_computeNeighbourShard, tasks):
+                self._neighbours[start:start + len(neighbours)] = neighbours
+                self._distances[start:start + len(distances)] = distances
+        self._dirty.clear()
+        self._stale.clear()
+
+    def _grow(self):
+        np = self._np
+        missing = self._store.getUserCount() - len(self._neighbours)
+        if missing > 0:
+            self._neighbours = np.vstack([self._neighbours, np.full((missing, self._k), -1, dtype=np.int32)])
+            self._distances = np.vstack([self._distances, np.full((missing, self._k), np.inf)])
+            self._stale.update(range(len(self._neighbours) - missing, len(self._neighbours)))
+
+    def _setRow(self, userIndex, neighbours, distances):
+        self._neighbours[userIndex] = -1
+        self._distances[userIndex] = self._np.inf
+        self._neighbours[userIndex, :len(neighbours)] = neighbours
+        self._distances[userIndex, :len(distances)] = distances
+
+    def _recompute(self, userIndex):
+        neighbours, distances = self._engine.topNeighbours(userIndex, self._k, self._metric)
+        self._setRow(userIndex, neighbours, distances)
+
+    def _patch(self, userIndex):
+        np = self._np
+        distances = self._engine.distances(userIndex, self._metric)
+        worst = self._distances[:, -1]
+        holds = (self._neighbours == userIndex).any(axis=1)
+        enters = ~holds & (distances < worst)
+        for other in np.flatnonzero(holds | enters):
+            if other == userIndex or other in self._stale:
+                continue
+            row = self._neighbours[other]
+            rowDistances = self._distances[other]
+            keep = row != userIndex
+            if holds[other] and distances[other] > worst[other] and np.isfinite(worst[other]):
+                # userIndex moved past the last kept neighbour; the true replacement is unknown
+                self._stale.add(other)
+                continue
+            candidates = np.append(row[keep & (row >= 0)], userIndex)
+            candidateDistances = np.append(rowDistances[keep & (row >= 0)], distances[other])
+            finite = np.isfinite(candidateDistances)
+            candidates, candidateDistances = candidates[finite], candidateDistances[finite]
+            order = np.lexsort((candidates, candidateDistances))[:self._k]
+            self._setRow(other, candidates[order], candidateDistances[order])
+        self._recompute(userIndex)
+
+    def refresh(self):
+        self._grow()
+        dirty, self._dirty = self._dirty, set()
+        for userIndex in dirty:
+            self._patch(userIndex)
+            self._stale.discard(userIndex)
+        stale, self._stale = self._stale, set()
+        for userIndex in stale:
+            self._recompute(userIndex)
+
+    def getNeighbours(self, userIndex):
+        if self._dirty or self._stale:
+            self.refresh()
+        row = self._neighbours[userIndex]
+        valid = row >= 0
+        return row[valid], self._distances[userIndex][valid]
+
+    def recommend(self, userIndex, count=1):
+        # Merge the neighbours' ratings of movies the user has not seen, weighting closer
+        # neighbours higher; returns up to count movie indices, best first
+        neighbours, distances = self.getNeighbours(userIndex)
+        watched = {movieIndex for movieIndex, _ in self._store.iterUserRatings(userIndex)}
+        scores = {}
+        for neighbour, distance in zip(neighbours.tolist(), distances.tolist()):
+            weight = 1.0 / (1.0 + distance)
+            for movieIndex, value in self._store.iterUserRatings(neighbour):
+                if movieIndex not in watched:
+                    scores[movieIndex] = scores.get(movieIndex, 0.0) + weight * value
+        return heapq.nlargest(count, scores, key=lambda movieIndex: (scores[movieIndex], -movieIndex))
+
+
+def _shareArrays(arrays):
+    # Copy arrays into shared memory blocks; returns the blocks and picklable (name, dtype, length) specs
+    from multiprocessing import shared_memory
+    np = _importNumpy()
+    blocks, specs = [], []
+    for a in arrays:
+        a = np.asarray(a)
+        block = shared_memory.SharedMemory(create=True, size=max(a.nbytes, 1))
+        np.ndarray(a.shape, dtype=a.dtype, buffer=block.buf)[:] = a
+        blocks.append(block)
+        specs.append((block.name, a.dtype.str, len(a)))
+    return blocks, specs
+
+
+def _idArray(np, ids):
+    # Ids as a fixed-width array that fits in shared memory; ids of mixed or custom types become text
+    try:
+        values = np.asarray(ids)
+    except ValueError:      # Sequences of different lengths, e.g. tuples
+        values = None
+    if values is None or values.ndim != 1 or values.dtype.hasobject:
+        values = np.array([str(i) for i in ids], dtype=str)
+    return values
+
+
+def _initBatchWorker(userCount, specs):
+    # specs: the six rating arrays, the three user statistics, then the movie and user ids
+    global _workerEngine, _workerBlocks, _workerMovieIds, _workerUserIds
+    from multiprocessing import shared_memory
+    np = _importNumpy()
+    _workerBlocks = [shared_memory.SharedMemory(name=name) for name, _, _ in specs]
+    arrays = [np.ndarray((length,), dtype=dtype, buffer=block.buf)
+              for block, (_, dtype, length) in zip(_workerBlocks, specs)]
+    _workerEngine = SimilarityEngine.fromArrays(userCount, arrays[:6], arrays[6:9])
+    _workerMovieIds, _workerUserIds = arrays[9], arrays[10]
+
+
+def _topUnseenMovies(engine, userIndex, count, k, metric):
+    # Weighted merge of the k nearest neighbours' ratings over movies the user has not rated
+    np = engine._np
+    neighbours, distances = engine.topNeighbours(userIndex, k, metric)
+    if not len(neighbours):
+        return np.empty(0, dtype=np.int32), np.empty(0)
+    starts = engine._userPtr[neighbours]
+    lengths = engine._userPtr[neighbours + 1] - starts
+    offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+    weights = np.repeat(1.0 / (1.0 + distances), lengths)
+    movies, inverse = np.unique(engine._userCols[offsets], return_inverse=True)
+    scores = np.bincount(inverse, weights * engine._userVals[offsets])
+    unseen = ~np.isin(movies, engine.getUserRatings(userIndex)[0], assume_unique=True)
+    movies, scores = movies[unseen], scores[unseen]
+    top = _smallest(np, -scores, count)
+    return movies[top], scores[top]
+
+
+def _recommendBatchShard(task):
+    start, end, count, k, metric = task
+    lines = []
+    for userIndex in range(start, end):
+        movies, _ = _topUnseenMovies(_workerEngine, userIndex, count, k, metric)
+        titles = ','.join(str(movieId) for movieId in _workerMovieIds[movies].tolist())
+        lines.append(f'{_workerUserIds[userIndex].item()}\t{titles}\n')
+    return ''.join(lines)
+
+
+def recommendAllUsers(ratings, path, count=10, k=20, metric='absolute', workers=None, shardSize=1024):
+    # Writes one line per user, "userId<TAB>movieId,movieId,...", best first, in user order.
+    # Rating arrays, the user statistics computed once here and the ids live in shared memory, so
+    # workers do not get a copy each, and at most two shards per worker are in flight, so memory
+    # stays bounded however many users there are.
+    from concurrent.futures import ProcessPoolExecutor
+    np = _importNumpy()
+    store = ratings.getStore()
+    userCount = store.getUserCount()
+    arrays = store.getArrays()
+    movieIds = _idArray(np, [store.getMovieId(m) for m in range(store.getMovieCount())])
+    userIds = _idArray(np, [store.getUserId(u) for u in range(userCount)])
+    blocks, specs = _shareArrays(arrays + SimilarityEngine.userStatistics(userCount, arrays) + (movieIds, userIds))
+    tasks = ((start, min(start + shardSize, userCount), count, k, metric) for start in range(0, userCount, shardSize))
+    try:
+        with open(path, 'w') as output, ProcessPoolExecutor(
+                max_workers=workers, initializer=_initBatchWorker,
+                initargs=(userCount, specs)) as executor:
+            window = deque()
+            limit = 2 * (workers or os.cpu_count() or 1)
+            for task in tasks:
+                window.append(executor.submit(_recommendBatchShard, task))
+                if len(window) >= limit:
+                    output.write(window.popleft().result())
+            while window:
+                output.write(window.popleft().result())
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+    return userCount
+
+
+class MatrixFactorizationEngine:
+    # Latent factor model trained with alternating least squares: rating ~ mean + user . movie.
+    # Each half-step solves one small ridge regression per user (or movie); those solves are
+    # independent and LAPACK releases the GIL, so they are spread over a thread pool.
+    def __init__(self, factors=32, regularization=0.1, iterations=10, threads=None, seed=0):
+        self._np = _importNumpy()
+        if self._np is None:
+            raise ImportError('MatrixFactorizationEngine requires numpy')
+        self._factors = factors
+        self._regularization = regularization
+        self._iterations = iterations
+        self._threads = threads
+        self._seed = seed
+        self._mean = 0.0
+        self._userFactors = None
+        self._movieFactors = None
+        self._userIds = []
+        self._movieIds = []
+        self._seen = None
+
+    def _solveBlock(self, ptr, indices, values, fixed, target, start, end):
+        np = self._np
+        identity = np.eye(self._factors)
+        for row in range(start, end):
+            begin, finish = ptr[row], ptr[row + 1]
+            if begin == finish:
+                target[row] = 0.0
+                continue
+            other = fixed[indices[begin:finish]]
+            regularization = self._regularization * (finish - begin) * identity
+            target[row] = np.linalg.solve(other.T @ other + regularization, other.T @ values[begin:finish])
+
+    def _solveAll(self, executor, ptr, indices, values, fixed, target):
+        rows = len(ptr) - 1
+        blockSize = max(64, rows // (4 * (self._threads or os.cpu_count() or 1)))
+        futures = [executor.submit(self._solveBlock, ptr, indices, values, fixed, target, start, min(start + blockSize, rows))
+                   for start in range(0, rows, blockSize)]
+        for future in futures:
+            future.result()
+
+    def fit(self, ratings, checkpointPath=None):
+        np = self._np
+        store = ratings.getStore()
+        userPtr, userCols, userVals, moviePtr, movieRows, movieVals = (np.asarray(a) for a in store.getArrays())
+        userCount, movieCount = store.getUserCount(), store.getMovieCount()
+        self._userIds = [store.getUserId(u) for u in range(userCount)]
+        self._movieIds = [store.getMovieId(m) for m in range(movieCount)]
+        self._seen = (userPtr.copy(), userCols.copy())
+        self._mean = float(userVals.mean()) if len(userVals) else 0.0
+        userResiduals = userVals - self._mean
+        movieResiduals = movieVals - self._mean
+
+        rng = np.random.default_rng(self._seed)
+        self._userFactors = rng.normal(0, 0.1, (userCount, self._factors))
+        self._movieFactors = rng.normal(0, 0.1, (movieCount, self._factors))
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=self._threads) as executor:
+            for _ in range(self._iterations):
+                self._solveAll(executor, userPtr, userCols, userResiduals, self._movieFactors, self._userFactors)
+                self._solveAll(executor, moviePtr, movieRows, movieResiduals, self._userFactors, self._movieFactors)
+                if checkpointPath:
+                    self.save(checkpointPath)
+        return self
+
+    def predict(self, userIndex, movieIndex):
+        return self._mean + float(self._userFactors[userIndex] @ self._movieFactors[movieIndex])
+
+    def recommendBatch(self, userIndices, count=10):
+        # Movie indices per user, best first. One matrix product scores every movie for the whole
+        # batch; seen movies are masked out
+        np = self._np
+        userIndices = np.asarray(userIndices)
+        scores = self._userFactors[userIndices] @ self._movieFactors.T
+        userPtr, userCols = self._seen
+        for row, userIndex in enumerate(userIndices.tolist()):
+            scores[row, userCols[userPtr[userIndex]:userPtr[userIndex + 1]]] = -np.inf
+        return [_smallest(np, -row, count)[:np.isfinite(row).sum()] for row in scores]
+
+    def recommend(self, userIndex, count=10):
+        # Movie ids, best first
+        return [self._movieIds[movieIndex] for movieIndex in self.recommendBatch([userIndex], count)[0].tolist()]
+
+    def save(self, path):
+        # Ids are saved with the typed conversion of recommendAllUsers, so mixed ids load back as text
+        np = self._np
+        temporaryPath = f'{path}.{os.getpid()}.tmp.npz'
+        np.savez(temporaryPath, userFactors=self._userFactors, movieFactors=self._movieFactors,
+                 mean=np.array(self._mean), userIds=_idArray(np, self._userIds), movieIds=_idArray(np, self._movieIds),
+                 seenPtr=self._seen[0], seenCols=self._seen[1],
+                 settings=np.array([self._factors, self._regularization, self._iterations, self._seed]))
+        os.replace(temporaryPath, path)
+
+    @classmethod
+    def load(cls, path, threads=None):
+        np = _importNumpy()
+        with np.load(path, allow_pickle=False) as data:
+            factors, regularization, iterations, seed = data['settings'].tolist()
+            engine = cls(int(factors), regularization, int(iterations), threads, int(seed))
+            engine._userFactors = data['userFactors']
+            engine._movieFactors = data['movieFactors']
+            engine._mean = float(data['mean'])
+            engine._userIds = data['userIds'].tolist()
+            engine._movieIds = data['movieIds'].tolist()
+            engine._seen = (data['seenPtr'], data['seenCols'])
+        return engine
+
+
+def generateSyntheticRatings(userCount, movieCount, ratingsPerUser, factors=8, seed=0):
+    # MovieLens-shaped data: Zipf-like movie popularity, heavy-tailed activity per user and ratings
+    # drawn from a hidden low-rank model. Returns (userIds, movieIds, values) arrays.
+    np = _importNumpy()
+    rng = np.random.default_rng(seed)
+    popularity = 1.0 / np.arange(1, movieCount + 1) ** 0.8
+    popularity /= popularity.sum()
+    activity = np.clip(rng.lognormal(np.log(ratingsPerUser), 0.7, userCount).astype(int), 5, movieCount)
+    userIds = np.repeat(np.arange(userCount), activity)
+    movieIds = np.concatenate([rng.choice(movieCount, size, replace=False, p=popularity) for size in activity])
+    userTaste = rng.normal(0, 1, (userCount, factors))
+    movieTraits = rng.normal(0, 1, (movieCount, factors))
+    affinity = np.einsum('ij,ij->i', userTaste[userIds], movieTraits[movieIds]) / np.sqrt(factors)
+    values = np.clip(np.rint(3.5 + affinity + rng.normal(0, 0.5, len(userIds))), 1, 5).astype(np.int8)
+    return userIds, movieIds, values
+
+
+def benchmarkRecommenders(userCount=2000, movieCount=1000, ratingsPerUser=40, k=10, testFraction=0.1, seed=0):
+    # Offline evaluation on a held-out split: RMSE of the factor model, and precision@k of both
+    # engines, counting held-out movies rated 4 or more as relevant
+    np = _importNumpy()
+    userIds, movieIds, values = generateSyntheticRatings(userCount, movieCount, ratingsPerUser, seed=seed)
+    test = np.random.default_rng(seed + 1).random(len(values)) < testFraction
+
+    train = RatingRegister()
+    users = [User(u, f'User {u}') for u in range(userCount)]
+    movies = [Movie(m, f'Movie {m}') for m in range(movieCount)]
+    for u, m, v in zip(userIds[~test].tolist(), movieIds[~test].tolist(), values[~test].tolist()):
+        train.addRating(users[u], movies[m], MovieRating(v))
+    store = train.getStore()
+
+    start = time.perf_counter()
+    model = MatrixFactorizationEngine(seed=seed).fit(train)
+    trainTime = time.perf_counter() - start
+
+    testUsers = [store.getUserIndex(u) for u in userIds[test].tolist()]
+    testMovies = [store.getMovieIndex(m) for m in movieIds[test].tolist()]
+    known = [u is not None and m is not None for u, m in zip(testUsers, testMovies)]
+    errors = [model.predict(u, m) - v for u, m, v, ok in zip(testUsers, testMovies, values[test].tolist(), known) if ok]
+    rmse = float(np.sqrt(np.mean(np.square(errors))))
+
+    relevant = {}
+    for u, m, v, ok in zip(testUsers, testMovies, values[test].tolist(), known):
+        if ok and v >= 4:
+            relevant.setdefault(u, set()).add(m)
+    evaluated = sorted(relevant)
+    neighbourEngine = SimilarityEngine(store)
+    start = time.perf_counter()
+    factorHits = sum(len(relevant[u] & set(movies.tolist()))
+                     for u, movies in zip(evaluated, model.recommendBatch(evaluated, k)))
+    factorTime = time.perf_counter() - start
+    start = time.perf_counter()
+    neighbourHits = sum(len(relevant[u] & set(_topUnseenMovies(neighbourEngine, u, k, 20, 'absolute')[0].tolist()))
+                        for u in evaluated)
+    neighbourTime = time.perf_counter() - start
+
+    report = {
+        'ratings': len(values),
+        'trainSeconds': trainTime,
+        'rmse': rmse,
+        'factorPrecisionAtK': factorHits / (k * len(evaluated)),
+        'neighbourPrecisionAtK': neighbourHits / (k * len(evaluated)),
+        'factorScoringSeconds': factorTime,
+        'neighbourScoringSeconds': neighbourTime,
+    }
+    print(f"{report['ratings']} ratings, ALS trained in {trainTime:.2f}s, test RMSE {rmse:.3f}")
+    print(f"precision@{k}: factors {report['factorPrecisionAtK']:.3f} ({factorTime:.2f}s), "
+          f"neighbours {report['neighbourPrecisionAtK']:.3f} ({neighbourTime:.2f}s)")
+    return report
+
+
+# Columnar rating files: a header, then blocks of a uint32 row count followed by that many int64
+# user ids, int64 movie ids and int8 ratings, so a block loads with three np.fromfile calls.
+COLUMNAR_MAGIC = b'RATC'
+COLUMNAR_VERSION = 1
+
+
+def writeColumnarRatings(path, userIds, movieIds, values, blockSize=1 << 20):
+    np = _importNumpy()
+    with open(path, 'wb') as output:
+        output.write(COLUMNAR_MAGIC + bytes([COLUMNAR_VERSION]))
+        for start in range(0, len(values), blockSize):
+            end = min(start + blockSize, len(values))
+            np.array([end - start], dtype='<u4').tofile(output)
+            np.asarray(userIds[start:end], dtype='<i8').tofile(output)
+            np.asarray(movieIds[start:end], dtype='<i8').tofile(output)
+            np.asarray(values[start:end], dtype='i1').tofile(output)
+
+
+def iterColumnarRatings(path):
+    np = _importNumpy()
+    with open(path, 'rb') as source:
+        if source.read(len(COLUMNAR_MAGIC) + 1) != COLUMNAR_MAGIC + bytes([COLUMNAR_VERSION]):
+            raise ValueError('Not a columnar rating file')
+        while True:
+            header = np.fromfile(source, dtype='<u4', count=1)
+            if not len(header):
+                return
+            count = int(header[0])
+            userIds = np.fromfile(source, dtype='<i8', count=count)
+            movieIds = np.fromfile(source, dtype='<i8', count=count)
+            values = np.fromfile(source, dtype='i1', count=count)
+            if len(values) != count:
+                raise ValueError('Truncated columnar rating file')
+            yield userIds, movieIds, values
+
+
+def iterCsvRatings(path, chunkSize=1 << 20):
+    # "userId,movieId,rating" lines with integer ids; a non-numeric first line is taken as a header.
+    # Fractional ratings such as MovieLens half stars are rounded.
+    np = _importNumpy()
+    with open(path) as source:
+        first = source.readline()
+        lines = [] if not first or not first.split(',')[0].strip().lstrip('-').isdigit() else [first]
+        while True:
+            lines.extend(itertools.islice(source, chunkSize - len(lines)))
+            if not lines:
+                return
+            table = np.loadtxt(lines, delimiter=',', usecols=(0, 1, 2), ndmin=2)
+            lines = []
+            yield (table[:, 0].astype(np.int64), table[:, 1].astype(np.int64),
+                   np.clip(np.rint(table[:, 2]), 1, 5).astype(np.int8))
+
+
+def loadRatings(ratings, path, chunkSize=1 << 20):
+    # Streams a columnar (.ratc) or CSV file into the register chunk by chunk; returns the rows read
+    with open(path, 'rb') as source:
+        columnar = source.read(len(COLUMNAR_MAGIC)) == COLUMNAR_MAGIC
+    chunks = iterColumnarRatings(path) if columnar else iterCsvRatings(path, chunkSize)
+    rows = 0
+    for userIds, movieIds, values in chunks:
+        ratings.addRatingsBulk(userIds, movieIds, values)
+        rows += len(values)
+    ratings.getStore().merge()
+    return rows
+
+
+def _peakRssMegabytes():
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS. resource is Unix-only, so it is
+    # imported here rather than by the module
+    import resource
+    import sys
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1 << 20) if sys.platform == 'darwin' else peak / 1024
+
+
+def _writeBenchmarkFiles(columnarPath, csvPath, userCount, movieCount, ratingsPerUser, seed):
+    np = _importNumpy()
+    userIds, movieIds, values = generateSyntheticRatings(userCount, movieCount, ratingsPerUser, seed=seed)
+    writeColumnarRatings(columnarPath, userIds, movieIds, values)
+    np.savetxt(csvPath, np.column_stack([userIds, movieIds, values]), fmt='%d', delimiter=',',
+               header='userId,movieId,rating', comments='')
+
+
+def _measureIngestion(path):
+    ratings = RatingRegister()
+    start = time.perf_counter()
+    rows = loadRatings(ratings, path)
+    elapsed = time.perf_counter() - start
+    store = ratings.getStore()
+    return {
+        'rows': rows,
+        'ratings': store.getRatingCount(),
+        'ratingsPerSecond': rows / elapsed,
+        'storeBytesPerRating': store.getArrayBytes() / max(store.getRatingCount(), 1),
+        'peakRssMegabytes': _peakRssMegabytes(),
+    }
+
+
+def benchmarkIngestion(userCount=100000, movieCount=10000, ratingsPerUser=20, directory=None, seed=0):
+    # ru_maxrss is a lifetime peak, so the files are generated and each format is loaded in a fresh
+    # child process; each peak RSS then reflects loading that format only
+    import tempfile
+    from concurrent.futures import ProcessPoolExecutor
+    report = {}
+    with tempfile.TemporaryDirectory(dir=directory) as folder:
+        columnarPath = os.path.join(folder, 'ratings.ratc')
+        csvPath = os.path.join(folder, 'ratings.csv')
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            executor.submit(_writeBenchmarkFiles, columnarPath, csvPath, userCount, movieCount, ratingsPerUser, seed).result()
+        for name, path in (('columnar', columnarPath), ('csv', csvPath)):
+            with ProcessPoolExecutor(max_workers=1) as executor:
+                result = report[name] = executor.submit(_measureIngestion, path).result()
+            print(f"{name}: {result['rows']} rows in {result['rows'] / result['ratingsPerSecond']:.2f}s "
+                  f"({result['ratingsPerSecond']:,.0f} ratings/s), {result['storeBytesPerRating']:.1f} bytes/rating, "
+                  f"peak RSS {result['peakRssMegabytes']:.0f} MB")
+    return report
+
+
+class RecommendationCache:
+    # Recommendations keyed by user id with LRU eviction, a TTL and a size bound. Every entry records
+    # the user ids it was computed from; a rating change by a user drops that user's entry and every
+    # entry that depended on them. Entries for new users depend on POPULAR, invalidated when the
+    # popular ranking is rebuilt, and entries computed by a full scan depend on ALL. Entries computed
+    # from neighbours also depend on movieKey of each movie the user rated, so a new co-rater drops
+    # them. A co-rater whose rating of some other movie shifts their cosine or pearson norm enough to
+    # become a neighbour is not tracked; such entries stay stale for at most the TTL.
+    POPULAR = object()
+    ALL = object()
+
+    @staticmethod
+    def movieKey(movieId):
+        return ('movie', movieId)
+
+    def __init__(self, maxSize=10000, ttl=300.0, clock=time.monotonic):
+        self._maxSize = maxSize
+        self._ttl = ttl
+        self._clock = clock
+        self._entries = OrderedDict()   # Map<UserId, (value, expiresAt, dependencies)>
+        self._dependents = {}           # Map<UserId or marker, Set<UserId>>
+        self._hits = self._misses = self._expirations = self._evictions = self._invalidations = 0
+        self._hitSeconds = self._missSeconds = 0.0
+
+    def get(self, userId):
+        # Returns (True, value) on a hit and (False, None) on a miss
+        entry = self._entries.get(userId)
+        if entry is not None:
+            if entry[1] > self._clock():
+                self._entries.move_to_end(userId)
+                self._hits += 1
+                return True, entry[0]
+            self._remove(userId)
+            self._expirations += 1
+        self._misses += 1
+        return False, None
+
+    def put(self, userId, value, dependencies=()):
+        if userId in self._entries:
+            self._remove(userId)
+        dependencies = frozenset(dependencies)
+        self._entries[userId] = (value, self._clock() + self._ttl, dependencies)
+        for dependency in dependencies:
+            self._dependents.setdefault(dependency, set()).add(userId)
+        while len(self._entries) > self._maxSize:
+            self._remove(next(iter(self._entries)))
+            self._evictions += 1
+
+    def _remove(self, userId):
+        _, _, dependencies = self._entries.pop(userId)
+        for dependency in dependencies:
+            dependents = self._dependents.get(dependency)
+            if dependents is not None:
+                dependents.discard(userId)
+                if not dependents:
+                    del self._dependents[dependency]
+
+    def invalidate(self, userId, movieId=None, popular=True):
+        # The user's ratings changed, of movieId if known; popular is whether the popular ranking changed
+        stale = {userId} | self._dependents.get(userId, set()) | self._dependents.get(self.ALL, set())
+        if movieId is not None:
+            stale |= self._dependents.get(self.movieKey(movieId), set())
+        if popular:
+            stale |= self._dependents.get(self.POPULAR, set())
+        for staleId in stale:
+            if staleId in self._entries:
+                self._remove(staleId)
+                self._invalidations += 1
+
+    def recordLatency(self, hit, seconds):
+        if hit:
+            self._hitSeconds += seconds
+        else:
+            self._missSeconds += seconds
+
+    def clear(self):
+        self._entries.clear()
+        self._dependents.clear()
+
+    def getMetrics(self):
+        lookups = self._hits + self._misses
+        return {
+            'size': len(self._entries),
+            'hits': self._hits,
+            'misses': self._misses,
+            'hitRate': self._hits / lookups if lookups else 0.0,
+            'expirations': self._expirations,
+            'evictions': self._evictions,
+            'invalidations': self._invalidations,
+            'meanHitSeconds': self._hitSeconds / self._hits if self._hits else 0.0,
+            'meanMissSeconds': self._missSeconds / self._misses if self._misses else 0.0,
+        }
+
+
 class MovieRecommendation:
-    def __init__(self, ratings):
+    def __init__(self, ratings, metric='absolute', neighbourIndex=None, cache=None):
         self._movieRatings = ratings
+        self._metric = metric
+        self._neighbourIndex = neighbourIndex
+        self._cache = cache
+        self._popularVersion = ratings.getPopularVersion()
+        if cache is not None:
+            ratings.addListener(self._onRatingChanged)
+        self._engine = None
+        if _importNumpy() is not None:
+            self._engine = SimilarityEngine(ratings.getStore())
+        elif metric != 'absolute':
+            raise ImportError(f'The {metric} metric requires numpy')
+
+    def _onRatingChanged(self, userIndex, movieIndex, previous, value):
+        if previous is not None and previous == value:
+            return      # Re-rating with the same value changes nothing the cache depends on
+        store = self._movieRatings.getStore()
+        # Rebuilds the popular ranking if enough writes have accumulated
+        self._movieRatings.getPopularMovies(1)
+        popularChanged = self._movieRatings.getPopularVersion() != self._popularVersion
+        self._popularVersion = self._movieRatings.getPopularVersion()
+        movieId = store.getMovieId(movieIndex) if movieIndex is not None else None
+        self._cache.invalidate(store.getUserId(userIndex), movieId, popularChanged)
 
     def recommendMovie(self, user):
+        if self._cache is None:
+            return self._recommendMovie(user)
+        start = time.perf_counter()
+        hit, title = self._cache.get(user.getId())
+        if not hit:
+            dependencies = set()
+            title = self._recommendMovie(user, dependencies)
+            self._cache.put(user.getId(), title, dependencies)
+        self._cache.recordLatency(hit, time.perf_counter() - start)
+        return title
+
+    def _recommendMovie(self, user, dependencies=None):
+        # dependencies, when given, collects the user ids and cache markers the result was computed from
         if len(self._movieRatings.getUserMovies(user)) == 0:
-            return self._recommendMovieNewUser()
+            return self._recommendMovieNewUser(dependencies)
         else:
-            return self._recommendMovieExistingUser(user)
+            return self._recommendMovieExistingUser(user, dependencies)
 
-    def _recommendMovieNewUser(self):
-        best_movie = None
-        best_rating = 0
-        for movie in self._movieRatings.getMovies():
-            rating = self._movieRatings.getAverageRating(movie)
-            if rating > best_rating:
-                best_movie = movie
-                best_rating = rating
-        return best_movie.getTitle() if best_movie else None
+    def _recommendMovieNewUser(self, dependencies):
+        popular = self._movieRatings.getPopularMovies(1)
+        if dependencies is not None:
+            dependencies.add(RecommendationCache.POPULAR)
+            # Cached POPULAR entries are current up to this ranking, which may have just been built
+            self._popularVersion = self._movieRatings.getPopularVersion()
+        return self._movieRatings.getMovies()[popular[0]].getTitle() if popular else None
 
-    def _recommendMovieExistingUser(self, user):
+    def _recommendMovieExistingUser(self, user, dependencies):
+        store = self._movieRatings.getStore()
+        userIndex = store.getUserIndex(user.getId())
+        if dependencies is not None:
+            dependencies.update(RecommendationCache.movieKey(store.getMovieId(movieIndex))
+                                for movieIndex, _ in store.iterUserRatings(userIndex))
+        if self._neighbourIndex is not None:
+            movies = self._neighbourIndex.recommend(userIndex)
+            if dependencies is not None:
+                dependencies.update(store.getUserId(neighbour) for neighbour in self._neighbourIndex.getNeighbours(userIndex)[0].tolist())
+            if movies:
+                return self._movieRatings.getMovies()[movies[0]].getTitle()
+        if self._engine is not None:
+            return self._recommendFromNeighbours(user, dependencies)
+        if dependencies is not None:
+            dependencies.add(RecommendationCache.ALL)
         best_movie = None
         similarity_score = float('inf') # Lower is better
 
@@ -113,37 +1383,59 @@ class MovieRecommendation:
                 score += abs(cur_movie_ratings[user1_id].value - cur_movie_ratings[user2_id].value)
         return score
 
+    def _recommendFromNeighbours(self, user, dependencies):
+        # Walk reviewers from the closest outwards and take the first one with an unwatched movie
+        store = self._movieRatings.getStore()
+        userIndex = store.getUserIndex(user.getId())
+        userCount = self._engine.getUserCount()
+        k = 16
+        while True:
+            neighbours, _ = self._engine.topNeighbours(userIndex, k, self._metric)
+            for reviewerIndex in neighbours[k // 2 if k > 16 else 0:]:
+                if dependencies is not None:
+                    dependencies.add(store.getUserId(reviewerIndex))
+                best_movie = self._recommendUnwatchedMovie(user, self._movieRatings.getUsers()[reviewerIndex])
+                if best_movie:
+                    return best_movie.getTitle()
+            if len(neighbours) < k or k >= userCount:
+                return None
+            k *= 2
+
     def _recommendUnwatchedMovie(self, user, reviewer):
-        user_id = user.getId()
-        reviewer_id = reviewer.getId()
-        best_movie = None
+        store = self._movieRatings.getStore()
+        user_index = store.getUserIndex(user.getId())
+        watched = {movie_index for movie_index, _ in store.iterUserRatings(user_index)}
+        best_movie_index = None
         best_rating = 0
 
-        reviewer_movies = self._movieRatings.getUserMovies(reviewer)
-        for movie in reviewer_movies:
-            cur_movie_ratings = self._movieRatings.getMovieRatings(movie)
-            if user_id not in cur_movie_ratings and cur_movie_ratings[reviewer_id].value > best_rating:
-                best_movie = movie
-                best_rating = cur_movie_ratings[reviewer_id].value
-        return best_movie
+        for movie_index, rating in store.iterUserRatings(store.getUserIndex(reviewer.getId())):
+            if movie_index not in watched and rating > best_rating:
+                best_movie_index = movie_index
+                best_rating = rating
+        return self._movieRatings.getMovies()[best_movie_index] if best_movie_index is not None else None
+
+
+def main():
+    user1 = User(1, 'User 1')
+    user2 = User(2, 'User 2')
+    user3 = User(3, 'User 3')
 
+    movie1 = Movie(1, 'Batman Begins')
+    movie2 = Movie(2, 'Liar Liar')
+    movie3 = Movie(3, 'The Godfather')
 
-user1 = User(1, 'User 1')
-user2 = User(2, 'User 2')
-user3 = User(3, 'User 3')
+    ratings = RatingRegister()
+    ratings.addRating(user1, movie1, MovieRating.FIVE)
+    ratings.addRating(user1, movie2, MovieRating.TWO)
+    ratings.addRating(user2, movie2, MovieRating.TWO)
+    ratings.addRating(user2, movie3, MovieRating.FOUR)
 
-movie1 = Movie(1, 'Batman Begins')
-movie2 = Movie(2, 'Liar Liar')
-movie3 = Movie(3, 'The Godfather')
+    recommender = MovieRecommendation(ratings)
 
-ratings = RatingRegister()
-ratings.addRating(user1, movie1, MovieRating.FIVE)
-ratings.addRating(user1, movie2, MovieRating.TWO)
-ratings.addRating(user2, movie2, MovieRating.TWO)
-ratings.addRating(user2, movie3, MovieRating.FOUR)
+    print(recommender.recommendMovie(user1)) # The Godfather
+    print(recommender.recommendMovie(user2)) # Batman Begins
+    print(recommender.recommendMovie(user3)) # Batman Begins
 
-recommender = MovieRecommendation(ratings)
 
-print(recommender.recommendMovie(user1)) # The Godfather
-print(recommender.recommendMovie(user2)) # Batman Begins
-print(recommender.recommendMovie(user3)) # Batman Begins
\ No newline at end of file
+if __name__ == '__main__':
+    main()
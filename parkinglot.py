@@ -113,20 +113,24 @@ class ParkingSystem:
 
         del self._timeParked[driver.get_id()]
         return self._parkingGarage.remove_vehicle(driver.get_vehicle())
-    
 
-parkingGarage = ParkingGarage(3,2)
-parkingSystem = ParkingSystem(parkingGarage, 5)
 
-driver1 = Driver(1, Car())
-driver2 = Driver(2, Limo())
-driver3 = Driver(3, SemiTruck())
+def main():
+    parkingGarage = ParkingGarage(3,2)
+    parkingSystem = ParkingSystem(parkingGarage, 5)
+
+    driver1 = Driver(1, Car())
+    driver2 = Driver(2, Limo())
+    driver3 = Driver(3, SemiTruck())
+
+    print(parkingSystem.park_vehicle(driver1)) # true
+    print(parkingSystem.park_vehicle(driver2)) # true 
+    print(parkingSystem.park_vehicle(driver3)) # false
 
-print(parkingSystem.park_vehicle(driver1)) # true
-print(parkingSystem.park_vehicle(driver2)) # true 
-print(parkingSystem.park_vehicle(driver3)) # false
+    print(parkingSystem.remove_vehicle(driver1)) # true
+    print(parkingSystem.remove_vehicle(driver2)) # true
+    print(parkingSystem.remove_vehicle(driver3)) # false
 
-print(parkingSystem.remove_vehicle(driver1)) # true
-print(parkingSystem.remove_vehicle(driver2)) # true
-print(parkingSystem.remove_vehicle(driver3)) # false
 
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+import pytest
+
+from movierecommendation import Movie, MovieRating, MovieRecommendation, RatingRegister, RecommendationCache, User
+
+np = pytest.importorskip('numpy')
+
+
+def test_add_rating_replaces_bulk_placeholders():
+    ratings = RatingRegister()
+    ratings.addRatingsBulk(np.array([1, 2]), np.array([10, 20]), np.array([5, 3], dtype=np.int8))
+    ratings.getMovies()     # Materializes the bulk-loaded ids as placeholders
+    ratings.addRating(User(1, 'User 1'), Movie(10, 'Batman Begins'), MovieRating.FIVE)
+    ratings.addRating(User(2, 'User 2'), Movie(20, 'The Incredibles'), MovieRating.THREE)
+
+    assert [movie.getTitle() for movie in ratings.getMovies()] == ['Batman Begins', 'The Incredibles']
+    assert MovieRecommendation(ratings).recommendMovie(User(3, 'User 3')) == 'Batman Begins'
+
+
+def test_cache_keeps_cold_start_entries_until_popular_ranking_changes():
+    ratings = RatingRegister()
+    movies = [Movie(index, f'Movie {index}') for index in range(10)]
+    for userId in range(40):
+        for movie in movies[:5]:
+            ratings.addRating(User(userId, None), movie, MovieRating.FOUR)
+    cache = RecommendationCache()
+    recommendation = MovieRecommendation(ratings, cache=cache)
+    newUser = User(100, 'New')
+    recommendation.recommendMovie(newUser)
+    ratings.addRating(User(0, None), movies[6], MovieRating.TWO)   # 1 write of 201: no rebuild
+    assert cache.get(newUser.getId())[0]
+
+
+def test_cache_drops_entry_when_a_new_reviewer_rates_the_users_movie():
+    ratings = RatingRegister()
+    user, other, newcomer = User(1, 'User 1'), User(2, 'User 2'), User(3, 'User 3')
+    movies = [Movie(index, f'Movie {index}') for index in range(3)]
+    ratings.addRating(user, movies[0], MovieRating.FIVE)
+    ratings.addRating(other, movies[1], MovieRating.FIVE)
+    cache = RecommendationCache()
+    recommendation = MovieRecommendation(ratings, cache=cache)
+    recommendation.recommendMovie(user)
+    ratings.addRating(newcomer, movies[0], MovieRating.FIVE)
+    assert not cache.get(user.getId())[0]